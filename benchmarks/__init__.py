@@ -0,0 +1 @@
+"""Benchmarks for the API, run them from the repository root with python -m benchmarks.<name>."""
@@ -0,0 +1,131 @@
+"""Benchmark of the hot lookup and listing queries before and after the index migration.
+
+Builds a database at schema version 1, fills it and times the queries the API issues,
+then applies the remaining migrations and times them again. The query plans show the
+full table scans turning into index seeks.
+
+Usage:
+    python -m benchmarks.indexes --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import sqlite
+
+from src.core.models import Post, User
+from src.database.migrations import MIGRATIONS
+
+
+def _compile(statement) -> str:
+    """Compiles a SQLAlchemy statement to the SQL SQLite receives."""
+    return str(
+        statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+def get_queries(users: int) -> dict[str, str]:
+    """Returns the benchmarked queries, as issued by the API."""
+    name = f"user-{users // 2}"
+    user_id = users // 2
+    return {
+        # get_user_by_name, run on every authenticated request.
+        "user_by_name": _compile(User.__table__.select().where(User.name == name)),
+        # The posts of one user.
+        "posts_by_user": _compile(
+            Post.__table__.select()
+            .where(Post.user_id == user_id)
+            .order_by(Post.id)
+            .limit(50)
+        ),
+    }
+
+
+def fill(connection: sqlite3.Connection, rows: int, users: int) -> None:
+    """Fills the database with users and posts."""
+    start = datetime(2024, 1, 1)
+    connection.executemany(
+        "INSERT INTO users (id, name, password, created_at) VALUES (?, ?, ?, ?)",
+        ((i, f"user-{i}", "password", start) for i in range(1, users + 1)),
+    )
+    connection.executemany(
+        "INSERT INTO posts (id, name, content, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+        (
+            (i, f"post-{i}", "content", i % users + 1, start + timedelta(seconds=i))
+            for i in range(1, rows + 1)
+        ),
+    )
+    connection.commit()
+
+
+def measure(connection: sqlite3.Connection, sql: str, repeat: int) -> dict:
+    """Returns the query plan and the median and p99 latency of a query."""
+    plan = [row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(sql).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "plan": plan,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+    }
+
+
+def run(rows: int, users: int, repeat: int) -> dict:
+    """Runs the benchmark on a temporary database."""
+    queries = get_queries(users)
+    results: dict = {"rows": rows, "users": users, "before": {}, "after": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection = sqlite3.connect(os.path.join(directory, "benchmark.db"))
+        for statement in MIGRATIONS[0].statements:
+            connection.execute(statement)
+        fill(connection, rows, users)
+
+        for name, sql in queries.items():
+            results["before"][name] = measure(connection, sql, repeat)
+
+        for migration in MIGRATIONS[1:]:
+            for statement in migration.statements:
+                connection.execute(statement)
+        connection.execute("ANALYZE")
+        connection.commit()
+
+        for name, sql in queries.items():
+            results["after"][name] = measure(connection, sql, repeat)
+        connection.close()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of posts")
+    parser.add_argument("--users", type=int, default=10_000, help="number of users")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.users, args.repeat)
+    for name in results["before"]:
+        before, after = results["before"][name], results["after"][name]
+        print(f"{name}:")
+        print(f"  before {before['p50_ms']:>10.3f} ms  {'; '.join(before['plan'])}")
+        print(f"  after  {after['p50_ms']:>10.3f} ms  {'; '.join(after['plan'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""Load test of the REST and WebSocket paths.
+
+Drives the API in-process through the ASGI transport of httpx, on a temporary database,
+or a running server with --target, and measures the throughput and latency of:
+
+- POST /posts, one post per request;
+- DELETE /posts/{post_id}, authenticated with a bearer token;
+- GET /posts with 10k, 100k and 1M posts in the database;
+- the fan-out of a created post to 1k and 10k delta websocket clients, from sending the
+  POST until a client received the post_created event.
+
+In-process, the websocket clients are simulated: they are registered with the broadcaster
+like real connections, but their frames are handed to the benchmark instead of a socket.
+Against a server they are real connections, so raise the open file limit (ulimit -n) for
+10k clients. Posts are added to the server's database and the row counts are the posts
+the benchmark added, so use an empty database.
+
+Usage:
+    python -m benchmarks.load --output results.json
+    python -m benchmarks.load --target http://127.0.0.1:8000 --rows 10000 --clients 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+SEED_BATCH = 10_000
+
+
+def summarize(timings: list[float], elapsed: float, errors: int = 0) -> dict:
+    """Returns the throughput and the latency percentiles of timings in milliseconds."""
+    timings = sorted(timings)
+    if not timings:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "throughput_rps": round(len(timings) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+async def run_requests(
+    send: Callable[[int], Awaitable[httpx.Response]], count: int, concurrency: int
+) -> dict:
+    """Sends count requests from concurrency workers and summarizes their latency.
+
+    Args:
+        send: Sends the request with the given number.
+        count: The number of requests.
+        concurrency: The number of requests in flight at a time.
+
+    Returns:
+        The summary, see summarize.
+
+    """
+    numbers = iter(range(count))
+    timings: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for number in numbers:
+            started = time.perf_counter()
+            response = await send(number)
+            if response.is_success:
+                timings.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(timings, time.perf_counter() - started, errors)
+
+
+class SimulatedWebSocket:
+    """Stands in for the websocket of an in-process client and records its events."""
+
+    def __init__(self, on_event: Callable[[], None]) -> None:
+        self.on_event = on_event
+
+    async def send_text(self, data: str) -> None:
+        if '"post_created"' in data:
+            self.on_event()
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self.send_text(data.decode(errors="ignore"))
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+class FanOut:
+    """Collects the arrival times of one event at every websocket client."""
+
+    def __init__(self, clients: int) -> None:
+        self.clients = clients
+        self.arrivals: list[float] = []
+        self.done = asyncio.Event()
+
+    def reset(self) -> None:
+        """Prepares for the next event."""
+        self.arrivals = []
+        self.done.clear()
+
+    def record(self) -> None:
+        """Records that a client received the event."""
+        self.arrivals.append(time.perf_counter())
+        if len(self.arrivals) >= self.clients:
+            self.done.set()
+
+
+async def connect_simulated(clients: int, fan_out: FanOut) -> Callable[[], Awaitable[None]]:
+    """Registers simulated delta clients and returns a function disconnecting them."""
+    # pylint: disable=import-outside-toplevel
+    from src.routers.posts.websockets import close_connection, open_connection, send_snapshot
+
+    connections = []
+    for _ in range(clients):
+        connection = open_connection(SimulatedWebSocket(fan_out.record), mode="delta")
+        await send_snapshot(connection)
+        connections.append(connection)
+
+    async def disconnect() -> None:
+        for connection in connections:
+            await close_connection(connection)
+
+    return disconnect
+
+
+async def connect_remote(
+    url: str, clients: int, fan_out: FanOut
+) -> Callable[[], Awaitable[None]]:
+    """Opens delta websocket connections to a server and returns a function closing them."""
+    # pylint: disable=import-outside-toplevel
+    import websockets
+
+    async def listen(websocket) -> None:
+        async for message in websocket:
+            if isinstance(message, bytes):
+                message = message.decode(errors="ignore")
+            if '"post_created"' in message:
+                fan_out.record()
+
+    websockets_ = []
+    for start in range(0, clients, 500):
+        websockets_ += await asyncio.gather(
+            *(
+                websockets.connect(url, max_size=None, open_timeout=60)
+                for _ in range(start, min(start + 500, clients))
+            )
+        )
+    listeners = [asyncio.create_task(listen(websocket)) for websocket in websockets_]
+
+    async def disconnect() -> None:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*(websocket.close() for websocket in websockets_))
+
+    return disconnect
+
+
+async def measure_fan_out(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    user_id: str,
+    fan_out: FanOut,
+    events: int,
+    timeout: float,
+) -> dict:
+    """Creates posts one after another and times their arrival at every client.
+
+    Returns:
+        The latency of every delivery and the time until the last client received an
+        event.
+
+    """
+    deliveries: list[float] = []
+    complete: list[float] = []
+    missed = 0
+    started = time.perf_counter()
+    for number in range(events):
+        fan_out.reset()
+        sent = time.perf_counter()
+        post = {"name": f"fan-out-{uuid.uuid4().hex}-{number}", "content": "x", "user_id": user_id}
+        response = await client.post(url, json=post, headers=headers)
+        response.raise_for_status()
+        try:
+            await asyncio.wait_for(fan_out.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        missed += fan_out.clients - len(fan_out.arrivals)
+        deliveries += [(arrival - sent) * 1000 for arrival in fan_out.arrivals]
+        if fan_out.arrivals:
+            complete.append((max(fan_out.arrivals) - sent) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "clients": fan_out.clients,
+        "events": events,
+        "missed_deliveries": missed,
+        "delivery": summarize(deliveries, elapsed),
+        "complete": summarize(complete, elapsed),
+    }
+
+
+async def seed(client: httpx.AsyncClient, url: str, headers: dict, user_id: str, count: int):
+    """Adds count posts through the bulk endpoint."""
+    prefix = uuid.uuid4().hex
+    for start in range(0, count, SEED_BATCH):
+        response = await client.post(
+            f"{url}/bulk",
+            json=[
+                {"name": f"seed-{prefix}-{i}", "content": "content", "user_id": user_id}
+                for i in range(start, min(start + SEED_BATCH, count))
+            ],
+            headers=headers,
+        )
+        response.raise_for_status()
+
+
+async def benchmark(
+    client: httpx.AsyncClient,
+    root_path: str,
+    connect: Callable[[int, FanOut], Awaitable[Callable[[], Awaitable[None]]]],
+    args: argparse.Namespace,
+) -> dict:
+    """Runs all benchmarks against the API behind client."""
+    # pylint: disable=import-outside-toplevel
+    from jose import jwt
+
+    from src.core.auth import ALGORITHM, SECRET_KEY
+
+    posts_url = f"{root_path}/posts"
+    name, password = f"load-{uuid.uuid4().hex[:12]}", "load"
+    response = await client.post(f"{root_path}/users", json={"name": name, "password": password})
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    token = jwt.encode({"name": name, "password": password}, SECRET_KEY, algorithm=ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+    results: dict = {}
+
+    # Fan-out first, while the snapshots the clients receive on connecting are small.
+    results["websocket_fan_out"] = []
+    for clients in args.clients:
+        fan_out = FanOut(clients)
+        disconnect = await connect(clients, fan_out)
+        try:
+            results["websocket_fan_out"].append(
+                await measure_fan_out(
+                    client, posts_url, headers, user_id, fan_out, args.events, args.timeout
+                )
+            )
+        finally:
+            await disconnect()
+
+    prefix = uuid.uuid4().hex
+    created: list[str] = []
+
+    async def create(number: int) -> httpx.Response:
+        response = await client.post(
+            posts_url,
+            json={"name": f"post-{prefix}-{number}", "content": "content", "user_id": user_id},
+            headers=headers,
+        )
+        if response.is_success:
+            created.append(response.json()["id"])
+        return response
+
+    results["create_post"] = await run_requests(create, args.requests, args.concurrency)
+
+    async def delete(number: int) -> httpx.Response:
+        return await client.delete(f"{posts_url}/{created[number]}", headers=headers)
+
+    results["delete_post"] = await run_requests(delete, len(created), args.concurrency)
+
+    results["list_posts"] = []
+    seeded = 0
+    for rows in sorted(args.rows):
+        await seed(client, posts_url, headers, user_id, rows - seeded)
+        seeded = rows
+
+        async def list_posts(_: int) -> httpx.Response:
+            return await client.get(posts_url)
+
+        results["list_posts"].append(
+            {"rows": rows, **await run_requests(list_posts, args.list_requests, 1)}
+        )
+
+    return results
+
+
+async def run_in_process(args: argparse.Namespace) -> dict:
+    """Runs the benchmarks against the app in this process, on a temporary database."""
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{directory}/benchmark.db"
+        os.environ["BROADCAST_BACKPLANE"] = "memory"
+        os.environ["LOGGING_REQUESTS_FILE"] = os.path.join(directory, "requests.log")
+        os.environ["LOGGING_CONTROLLERS_FILE"] = os.path.join(directory, "controllers.log")
+
+        # Imported here, so the engine is created for the temporary database.
+        # pylint: disable=import-outside-toplevel
+        from src.core.config import get_settings
+        from src.core.loggers import shutdown_logging
+        from src.main import app
+
+        # Server errors are counted as failed requests instead of being raised.
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        try:
+            async with app.router.lifespan_context(app):
+                async with httpx.AsyncClient(
+                    transport=transport, base_url="http://benchmark", timeout=None
+                ) as client:
+                    return await benchmark(
+                        client, get_settings().ROOT_PATH, connect_simulated, args
+                    )
+        finally:
+            shutdown_logging()
+
+
+async def run_remote(args: argparse.Namespace) -> dict:
+    """Runs the benchmarks against a running server."""
+    # pylint: disable=import-outside-toplevel
+    from src.core.config import get_settings
+
+    ws_url = args.target.replace("http", "ws", 1).rstrip("/") + "/ws?mode=delta"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.target, timeout=None, limits=limits) as client:
+        return await benchmark(
+            client,
+            get_settings().ROOT_PATH,
+            lambda clients, fan_out: connect_remote(ws_url, clients, fan_out),
+            args,
+        )
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Runs the benchmarks and adds the parameters and environment to the results."""
+    runner = run_remote if args.target else run_in_process
+    results = asyncio.run(runner(args))
+    return {
+        "target": args.target or "in-process",
+        "python": platform.python_version(),
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "list_requests": args.list_requests,
+            "events": args.events,
+        },
+        **results,
+    }
+
+
+def _counts(value: str) -> list[int]:
+    return [int(count) for count in value.split(",") if count]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="URL of a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="posts to create and delete")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument(
+        "--rows",
+        type=_counts,
+        default=[10_000, 100_000, 1_000_000],
+        help="comma separated post counts to list",
+    )
+    parser.add_argument("--list-requests", type=int, default=10, help="lists per post count")
+    parser.add_argument(
+        "--clients",
+        type=_counts,
+        default=[1_000, 10_000],
+        help="comma separated websocket client counts",
+    )
+    parser.add_argument("--events", type=int, default=20, help="posts per fan-out run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="wait per event, in s")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    for name in ("create_post", "delete_post"):
+        summary = results[name]
+        print(
+            f"{name}: {summary.get('throughput_rps')} req/s, p50 {summary.get('p50_ms')} ms, "
+            f"p99 {summary.get('p99_ms')} ms, {summary['errors']} errors"
+        )
+    for summary in results["list_posts"]:
+        print(
+            f"list_posts {summary['rows']} rows: p50 {summary.get('p50_ms')} ms, "
+            f"p99 {summary.get('p99_ms')} ms"
+        )
+    for summary in results["websocket_fan_out"]:
+        delivery, complete = summary["delivery"], summary["complete"]
+        print(
+            f"fan-out to {summary['clients']} clients: delivery p50 {delivery.get('p50_ms')} ms, "
+            f"p99 {delivery.get('p99_ms')} ms, all clients p99 {complete.get('p99_ms')} ms, "
+            f"{summary['missed_deliveries']} missed"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
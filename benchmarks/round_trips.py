@@ -0,0 +1,148 @@
+"""Benchmark of the statements per create and delete, before and after RETURNING.
+
+Creates and deletes posts one at a time, each in its own transaction, once the way
+crud.create and crud.delete used to (INSERT followed by a SELECT to read the generated
+columns back, and a SELECT of the row followed by the DELETE) and once with the current
+single INSERT ... RETURNING and DELETE ... RETURNING statements. It counts the statements
+sent to the database and times every operation.
+
+Usage:
+    python -m benchmarks.round_trips --operations 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+
+async def measure(
+    session_factory: Callable,
+    statements: list[int],
+    operation: Callable[[object, int], Awaitable[None]],
+    count: int,
+) -> dict:
+    """Runs an operation count times in transactions of their own.
+
+    Returns:
+        The statements per operation, excluding BEGIN and COMMIT, and the median and p99
+        latency.
+
+    """
+    timings = []
+    executed = statements[0]
+    for number in range(count):
+        started = time.perf_counter()
+        async with session_factory() as session:
+            await operation(session, number)
+            await session.commit()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "statements_per_operation": round((statements[0] - executed) / count, 2),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+    }
+
+
+async def run(operations: int) -> dict:
+    """Runs the benchmark on a temporary database."""
+    results: dict = {"operations": operations}
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{directory}/benchmark.db"
+
+        # Imported here, so the engine is created for the temporary database.
+        # pylint: disable=import-outside-toplevel
+        from sqlalchemy import event
+
+        from src.core.models import Post, User
+        from src.database import crud
+        from src.database.database import AsyncSessionLocal, engine
+        from src.database.migrations import migrate
+
+        await migrate(engine)
+        async with AsyncSessionLocal() as session:
+            session.add(User(name="benchmark", password="benchmark"))
+            await session.commit()
+
+        statements = [0]
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements[0] += 1
+
+        def new_post(variant: str, number: int) -> Post:
+            return Post(name=f"{variant}-{number}", content="content", user_id=1)
+
+        async def create_before(session, number: int) -> None:
+            post = new_post("before", number)
+            session.add(post)
+            await session.flush()
+            await session.refresh(post)
+
+        async def create_after(session, number: int) -> None:
+            await crud.create(new_post("after", number), session)
+
+        first_ids = {}
+
+        async def delete_before(session, number: int) -> None:
+            query = [Post.id == first_ids["before"] + number]
+            await crud.get(Post, session, query, expected_count=1)
+            await session.execute(Post.__table__.delete().where(*query))
+
+        async def delete_after(session, number: int) -> None:
+            await crud.delete(Post, session, [Post.id == first_ids["after"] + number])
+
+        for variant, create, delete in (
+            ("before", create_before, delete_before),
+            ("after", create_after, delete_after),
+        ):
+            first_ids[variant] = await _next_id(AsyncSessionLocal, Post)
+            results[variant] = {
+                "create": await measure(AsyncSessionLocal, statements, create, operations),
+                "delete": await measure(AsyncSessionLocal, statements, delete, operations),
+            }
+
+        await engine.dispose()
+
+    return results
+
+
+async def _next_id(session_factory: Callable, model) -> int:
+    """Returns the id the next created row of a model will get."""
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import func, select
+
+    async with session_factory() as session:
+        last = await session.scalar(select(func.max(model.id)))
+    return (last or 0) + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=2000, help="creates and deletes")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.operations))
+    for operation in ("create", "delete"):
+        before, after = results["before"][operation], results["after"][operation]
+        print(f"{operation}:")
+        for name, result in (("before", before), ("after", after)):
+            print(
+                f"  {name:<6} {result['statements_per_operation']:>5} statements  "
+                f"p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark of the full list endpoints with and without the fast JSON responses.
+
+Fills a temporary database and requests GET /posts and GET /users in-process, once
+validating the rows through the output schemas and once serializing the selected rows
+directly, and checks that both return the same bytes.
+
+Usage:
+    python -m benchmarks.serialization --rows 100000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+
+def measure(client, path: str, repeat: int) -> tuple[dict, bytes]:
+    """Returns the median and p99 latency of a request and the last response body."""
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        body = response.content
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        "bytes": len(body),
+    }, body
+
+
+def run(rows: int, users: int, repeat: int) -> dict:
+    """Runs the benchmark on a temporary database."""
+    results: dict = {"rows": rows, "users": users, "schema": {}, "fast": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.db")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+        os.environ["BROADCAST_BACKPLANE"] = "memory"
+
+        # Imported here, so the engine is created for the temporary database.
+        # pylint: disable=import-outside-toplevel
+        from fastapi.testclient import TestClient
+
+        from benchmarks.indexes import fill
+        from src.core.config import get_settings
+        from src.main import app
+
+        settings = get_settings()
+        with TestClient(app) as client:
+            connection = sqlite3.connect(path)
+            fill(connection, rows, users)
+            connection.close()
+
+            for endpoint in ("posts", "users"):
+                url = f"{settings.ROOT_PATH}/{endpoint}"
+                bodies = {}
+                for variant, fast in (("schema", False), ("fast", True)):
+                    settings.FAST_JSON_RESPONSES = fast
+                    results[variant][endpoint], bodies[variant] = measure(client, url, repeat)
+                results[f"{endpoint}_identical"] = bodies["schema"] == bodies["fast"]
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="number of posts")
+    parser.add_argument("--users", type=int, default=10_000, help="number of users")
+    parser.add_argument("--repeat", type=int, default=10, help="requests per endpoint")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.users, args.repeat)
+    for endpoint in ("posts", "users"):
+        schema, fast = results["schema"][endpoint], results["fast"][endpoint]
+        print(f"GET /{endpoint} ({schema['bytes']} bytes):")
+        print(f"  schema {schema['p50_ms']:>10.3f} ms")
+        print(f"  fast   {fast['p50_ms']:>10.3f} ms")
+        print(f"  identical: {results[f'{endpoint}_identical']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
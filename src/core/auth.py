@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.token_cache import verified_tokens
 from src.database.database import get_database
 from src.routers.users.controller import get_user_by_name
 
@@ -14,13 +15,17 @@ ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-# Function to decode JWT token
+# Function to decode JWT token, tokens that were verified before are served from a cache
 async def decode_token(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_database)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    verified = verified_tokens.get(token)
+    if verified is not None:
+        return verified.name
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         name, password = payload.get("name"), payload.get("password")
@@ -28,6 +33,8 @@ async def decode_token(token: str = Depends(oauth2_scheme), session: AsyncSessio
         if not name:
             raise credentials_exception
 
+        # Read before the lookup, so a deletion that commits meanwhile is not undone.
+        generation = verified_tokens.generation
         user = await get_user_by_name(name, session)
 
         if name != user.name or password != user.password:
@@ -35,6 +42,8 @@ async def decode_token(token: str = Depends(oauth2_scheme), session: AsyncSessio
 
     except JWTError:
         raise credentials_exception
+
+    verified_tokens.add(token, user.id, name, exp=payload.get("exp"), generation=generation)
     return name
 
 
@@ -0,0 +1,231 @@
+"""Publish/subscribe backplanes that carry broadcast messages between processes.
+
+Every process running the app holds its own websocket connections. A message published
+on the backplane is delivered to the handler of every process, which then fans it out to
+its local websockets.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
+
+from src.core.config import Settings, get_settings
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+MessageHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Published by a process after it reconnected to the hub, as messages may have been lost
+# in between. Handlers drop everything derived from earlier messages when receiving it.
+RESYNC_EVENT = "resync"
+
+_HEADER = struct.Struct("!I")
+_MAX_HUB_BUFFER = 16 * 1024 * 1024
+
+
+class Backplane(ABC):
+    """Delivers published messages to the handler of every subscribed process."""
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler) -> None:
+        """Subscribes this process.
+
+        Args:
+            handler: Called with every message published by any process.
+
+        """
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Unsubscribes this process."""
+
+    @abstractmethod
+    async def publish(self, message: dict[str, Any]) -> None:
+        """Publishes a JSON serializable message to all processes.
+
+        Args:
+            message: The message to publish.
+
+        """
+
+
+class InProcessBackplane(Backplane):
+    """Backplane for a single process, messages are handed to the handler directly."""
+
+    def __init__(self) -> None:
+        self._handler: MessageHandler | None = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, message: dict[str, Any]) -> None:
+        if self._handler is not None:
+            await self._handler(message)
+
+
+class UnixSocketBackplane(Backplane):
+    """Backplane for processes on one host, relayed by a hub on a Unix domain socket.
+
+    The first process to take the lock file next to the socket hosts the hub; every
+    process, including the hub, connects to it as a client. The hub relays each frame it
+    receives to all clients, so a process also receives its own messages. Because the lock
+    is released when its holder exits, another process takes over the hub when the hosting
+    process goes away and the clients reconnect to it.
+
+    Frames are JSON documents prefixed by their length as a 4-byte unsigned integer.
+    Messages published while reconnecting are only delivered to the local process, and
+    messages published by others in the meantime are not delivered to it at all. So after
+    reconnecting, a process publishes a resync event that tells every process, itself
+    included, to drop what it derived from earlier messages.
+    """
+
+    def __init__(self, path: str, reconnect_delay: float) -> None:
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self._handler: MessageHandler | None = None
+        self._lock_file: int | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._hub_clients: set[asyncio.StreamWriter] = set()
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+        reader = await self._connect()
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def stop(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._server is not None:
+            self._server.close()
+            for client in self._hub_clients:
+                client.close()
+            self._hub_clients.clear()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self._lock_file is not None:
+            os.close(self._lock_file)
+            self._lock_file = None
+        self._handler = None
+
+    async def publish(self, message: dict[str, Any]) -> None:
+        payload = json.dumps(message).encode()
+        if self._writer is None or self._writer.is_closing():
+            logger.warning("Backplane hub unavailable, delivering message locally only.")
+            if self._handler is not None:
+                await self._handler(message)
+            return
+
+        self._writer.write(_HEADER.pack(len(payload)) + payload)
+        await self._writer.drain()
+
+    async def _connect(self) -> asyncio.StreamReader:
+        """Connects to the hub, hosting it first if no other process does."""
+        while True:
+            await self._host_hub()
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+                return reader
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _host_hub(self) -> None:
+        """Starts the hub in this process if it can take the hub lock."""
+        if self._server is not None:
+            return
+
+        lock_file = os.open(f"{self.path}.lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_file)
+            return
+
+        self._lock_file = lock_file
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._relay, path=self.path)
+        logger.info(f"Hosting broadcast backplane hub on {self.path}.")
+
+    async def _relay(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Relays every frame received from one client to all clients of the hub."""
+        if self._server is None:
+            # Accepted just before the hub was stopped.
+            writer.close()
+            return
+        self._hub_clients.add(writer)
+        try:
+            while True:
+                frame = await _read_frame(reader)
+                for client in list(self._hub_clients):
+                    if client.transport.get_write_buffer_size() > _MAX_HUB_BUFFER:
+                        logger.warning("Backplane client is not reading, disconnecting it.")
+                        self._hub_clients.discard(client)
+                        client.close()
+                        continue
+                    client.write(_HEADER.pack(len(frame)) + frame)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # The client went away or the hub is shutting down.
+            pass
+        finally:
+            self._hub_clients.discard(writer)
+            writer.close()
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        """Hands every frame from the hub to the handler, reconnecting when it is lost."""
+        while True:
+            try:
+                frame = await _read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Lost connection to the backplane hub, reconnecting.")
+                self._writer = None
+                await asyncio.sleep(self.reconnect_delay)
+                reader = await self._connect()
+                await self.publish({"event": RESYNC_EVENT, "items": []})
+                continue
+
+            try:
+                await self._handler(json.loads(frame))
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error(f"Backplane handler failed: {error}.")
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Reads one length prefixed frame."""
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    return await reader.readexactly(length)
+
+
+def get_backplane(settings: Settings) -> Backplane:
+    """Creates the backplane configured in the settings.
+
+    Args:
+        settings: The application settings.
+
+    Returns:
+        The configured backplane.
+
+    """
+    if settings.BROADCAST_BACKPLANE == "unix":
+        return UnixSocketBackplane(
+            settings.BROADCAST_SOCKET_PATH,
+            reconnect_delay=settings.BROADCAST_RECONNECT_DELAY,
+        )
+    return InProcessBackplane()
@@ -0,0 +1,86 @@
+"""Coalescing of bursts of triggers into single runs of a callback."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from src.core.config import get_settings
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+
+class Coalescer:
+    """Runs a callback once for a burst of triggers.
+
+    A run is scheduled by the first trigger and starts once no trigger arrived for
+    `window` seconds, or `max_delay` seconds after the first trigger, whichever comes
+    first. Triggers arriving while the callback runs schedule the next run, so the last
+    trigger is always followed by a complete run. Runs never overlap.
+
+    Attributes:
+        triggers: The number of times a run was requested.
+        runs: The number of times the callback was run.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[], Awaitable[None]],
+        window: float,
+        max_delay: float,
+    ) -> None:
+        self.callback = callback
+        self.window = window
+        self.max_delay = max_delay
+        self.triggers = 0
+        self.runs = 0
+        self._first_trigger = 0.0
+        self._last_trigger = 0.0
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def merged(self) -> int:
+        """The number of triggers that were merged into the run of another trigger."""
+        return self.triggers - self.runs - (self._task is not None)
+
+    def trigger(self) -> None:
+        """Requests a run of the callback without waiting for it."""
+        now = asyncio.get_running_loop().time()
+        self.triggers += 1
+        self._last_trigger = now
+        if self._task is None:
+            self._first_trigger = now
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        """Cancels the scheduled run, if any."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict[str, int]:
+        """Returns the trigger, run and merge counters."""
+        return {"triggers": self.triggers, "runs": self.runs, "merged": self.merged}
+
+    async def _run(self) -> None:
+        """Waits for the burst to end, then runs the callback."""
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline = min(
+                self._last_trigger + self.window, self._first_trigger + self.max_delay
+            )
+            delay = deadline - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        # Triggers from here on schedule the next run.
+        self._task = None
+        async with self._lock:
+            self.runs += 1
+            try:
+                await self.callback()
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error(f"Coalesced callback failed: {error}.")
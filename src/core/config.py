@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import os
 from functools import lru_cache
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -23,10 +23,68 @@ class Settings(BaseSettings):
     LOGGER_REQUESTS_NAME: str
     LOGGING_CONTROLLERS_FILE: str
     LOGGER_CONTROLLERS_NAME: str
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_QUEUE_SIZE: int = Field(default=10000, gt=0, description="records")
+    LOG_BATCH_SIZE: int = Field(default=256, gt=0, description="records")
+    LOG_FLUSH_INTERVAL: float = Field(default=0.5, gt=0, description="s")
+    LOG_MAX_BYTES: int = Field(default=10 * 1024 * 1024, ge=0, description="bytes, 0 disables")
+    LOG_BACKUP_COUNT: int = Field(default=5, ge=0, description="files")
+    LOG_ROTATE_INTERVAL: Optional[float] = Field(default=None, gt=0, description="s")
 
     SERVICE_CONNECTION_TIMEOUT: int = Field(description="s")
     SERVICE_CONNECTION_RETRY_DELAY: int = Field(description="s")
 
+    DATABASE_RETRY_ATTEMPTS: int = Field(default=5, gt=0, description="attempts")
+    DATABASE_RETRY_BASE_DELAY: float = Field(default=0.01, gt=0, description="s")
+    DATABASE_BREAKER_THRESHOLD: int = Field(default=5, gt=0, description="operations")
+
+    DATABASE_URL: str = "sqlite+aiosqlite:///test.db"
+    DATABASE_PROFILE: Literal["default", "production"] = "production"
+    DATABASE_JOURNAL_MODE: Optional[Literal["DELETE", "TRUNCATE", "PERSIST", "WAL"]] = None
+    DATABASE_SYNCHRONOUS: Optional[Literal["OFF", "NORMAL", "FULL", "EXTRA"]] = None
+    DATABASE_MMAP_SIZE: Optional[int] = Field(default=None, ge=0, description="bytes")
+    DATABASE_CACHE_SIZE: Optional[int] = Field(
+        default=None, description="pages, or KiB if negative"
+    )
+    DATABASE_BUSY_TIMEOUT: Optional[int] = Field(default=None, ge=0, description="ms")
+    DATABASE_POOL_SIZE: Optional[int] = Field(default=None, gt=0, description="connections")
+    DATABASE_MAX_OVERFLOW: Optional[int] = Field(default=None, ge=0, description="connections")
+
+    # Commit concurrent post creations and deletions in shared transactions.
+    WRITE_BATCHING: bool = True
+    WRITE_BATCH_MAX_SIZE: int = Field(default=64, gt=0, description="operations")
+    WRITE_BATCH_MAX_LATENCY: float = Field(default=0.002, ge=0, description="s")
+
+    CACHE_MAX_ENTRIES: int = Field(default=4096, gt=0, description="entries")
+    CACHE_TTL: float = Field(default=30.0, ge=0, description="s")
+
+    TOKEN_CACHE_MAX_ENTRIES: int = Field(default=1024, gt=0, description="entries")
+    TOKEN_CACHE_TTL: float = Field(default=300.0, ge=0, description="s")
+
+    # Serialize full lists straight from the selected rows instead of validating them
+    # through the output schemas first.
+    FAST_JSON_RESPONSES: bool = True
+
+    # Traces memory allocations, which slows down every allocation; for debugging only.
+    TRACEMALLOC: bool = False
+
+    STREAM_CHUNK_SIZE: int = Field(default=500, gt=0, description="rows")
+    BULK_MAX_ITEMS: int = Field(default=10000, gt=0, description="items")
+
+    WEBSOCKET_SEND_TIMEOUT: float = Field(default=5.0, gt=0, description="s")
+    WEBSOCKET_QUEUE_SIZE: int = Field(default=32, gt=0, description="frames")
+    WEBSOCKET_OVERFLOW_POLICY: Literal["drop_oldest", "latest", "disconnect"] = "drop_oldest"
+    WEBSOCKET_MAX_TOPICS: int = Field(default=100, gt=0, description="topics")
+    WEBSOCKET_RATE_LIMIT: float = Field(default=5.0, gt=0, description="messages/s")
+    WEBSOCKET_RATE_BURST: int = Field(default=20, gt=0, description="messages")
+    WEBSOCKET_REPLAY_SIZE: int = Field(default=1024, ge=0, description="events")
+
+    BROADCAST_BACKPLANE: Literal["memory", "unix"] = "memory"
+    BROADCAST_SOCKET_PATH: str = "/tmp/fastapi-example-broadcast.sock"
+    BROADCAST_RECONNECT_DELAY: float = Field(default=0.5, gt=0, description="s")
+    BROADCAST_COALESCE_WINDOW: float = Field(default=0.05, ge=0, description="s")
+    BROADCAST_COALESCE_MAX_DELAY: float = Field(default=0.25, ge=0, description="s")
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -0,0 +1,49 @@
+"""Encodings of the frames sent to websocket clients.
+
+JSON is always available. MessagePack is optional and requires the msgpack package,
+installed with the msgpack extra.
+"""
+
+import json
+from typing import Any, Literal
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+Encoding = Literal["json", "msgpack"]
+
+
+def is_available(encoding: Encoding) -> bool:
+    """Returns whether the package an encoding needs is installed."""
+    return encoding != "msgpack" or msgpack is not None
+
+
+def encode(frame: Any, encoding: Encoding = "json") -> str | bytes:
+    """Encodes a JSON compatible frame.
+
+    Args:
+        frame: The frame.
+        encoding: The encoding.
+
+    Returns:
+        Compact JSON text, or MessagePack bytes.
+
+    """
+    if encoding == "msgpack":
+        return msgpack.packb(frame)
+    return json.dumps(frame, separators=(",", ":"))
+
+
+def to_columns(rows: list[dict]) -> dict[str, list]:
+    """Converts rows to a columnar layout, so every key is sent once instead of per row.
+
+    Example:
+        [{"id": "1", "name": "a"}, {"id": "2", "name": "b"}] becomes
+        {"id": ["1", "2"], "name": ["a", "b"]}.
+
+    """
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
@@ -1,9 +1,212 @@
-"""Centralized logging for the application."""
+"""Centralized logging for the application.
 
-from logging import Formatter, getLogger, FileHandler
+Loggers do not write to disk themselves: a QueueHandler puts every record on a bounded
+queue and a listener thread per log file writes the records in batches, so a slow disk
+never blocks the event loop. When a queue is full, records are dropped and counted.
+"""
 
+import atexit
+import json
+import queue
+import threading
+import time
+from logging import WARNING, Formatter, LogRecord, getLogger
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import Any, Optional
 
-def setup_logging(logger_settings: dict[str, str]) -> None:
+from src.core.metrics import CallbackMetric, registry
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Stops a listener once the records before it were written.
+_STOP = None
+
+_listeners: list["BatchingQueueListener"] = []
+
+
+class JsonFormatter(Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Puts records on a bounded queue without waiting, dropping them when it is full.
+
+    Only the message is resolved on the logging thread; formatting is left to the
+    listener.
+
+    Attributes:
+        dropped: The number of records dropped because the queue was full.
+    """
+
+    def __init__(self, record_queue: queue.Queue) -> None:
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks reference frames that may change before the listener runs.
+            record.exc_text = Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchFileHandler(RotatingFileHandler):
+    """A file handler that rotates by size and/or age and flushes once per batch.
+
+    The size is checked before writing a record, so a file can exceed max_bytes by one
+    record.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        interval: Optional[float] = None,
+    ) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record: LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.maxBytes
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+    def flush(self) -> None:
+        """Does nothing, the listener calls flush_batch after every batch."""
+
+    def flush_batch(self) -> None:
+        """Flushes the records written since the last batch."""
+        super().flush()
+
+
+class BatchingQueueListener:
+    """Writes the records of a queue to a handler from a background thread.
+
+    The thread waits for a record, takes up to batch_size records that are queued, writes
+    them and flushes once. Dropped records are reported with a warning in the log file.
+
+    Attributes:
+        queue: The queue to read the records from.
+        handler: The handler to write the records with.
+        source: The queue handler whose dropped records are reported.
+        batch_size: The maximum number of records written per flush.
+        flush_interval: How long a batch waits for records, in seconds.
+    """
+
+    def __init__(
+        self,
+        record_queue: queue.Queue,
+        handler: BatchFileHandler,
+        source: DroppingQueueHandler,
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        self.queue = record_queue
+        self.handler = handler
+        self.source = source
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reported_drops = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the listener thread."""
+        self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Writes the queued records and stops the listener thread."""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self.handler.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if _STOP in batch:
+                stopping = True
+                batch = [record for record in batch if record is not _STOP]
+            self._write(batch)
+
+    def _write(self, records: list[LogRecord]) -> None:
+        dropped = self.source.dropped - self._reported_drops
+        if dropped:
+            self._reported_drops += dropped
+            records.append(
+                LogRecord(
+                    self.source.name or "logging",
+                    WARNING,
+                    __file__,
+                    0,
+                    f"Dropped {dropped} log records because the log queue was full.",
+                    None,
+                    None,
+                )
+            )
+        if not records:
+            return
+        for record in records:
+            self.handler.handle(record)
+        self.handler.flush_batch()
+
+
+def _dropped_records() -> dict[tuple[str, ...], float]:
+    """Returns the dropped records by log file."""
+    return {(listener.handler.baseFilename,): listener.source.dropped for listener in _listeners}
+
+
+registry.register(
+    CallbackMetric(
+        "log_records_dropped_total",
+        "Log records dropped because the log queue was full, by file.",
+        _dropped_records,
+        ("file",),
+        type_name="counter",
+    )
+)
+
+
+def setup_logging(logger_settings: dict[str, Any]) -> None:
     """A function to set up the logging. This is centralized to ensure that the logging
     is easily swappable and consistent across the application.
 
@@ -11,8 +214,8 @@ def setup_logging(logger_settings: dict[str, str]) -> None:
         logger_settings: A dictionary containing the logger settings.
 
     """
-    formatter = Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter: Formatter = (
+        JsonFormatter() if logger_settings["LOG_FORMAT"] == "json" else Formatter(TEXT_FORMAT)
     )
     loggers = [
         (
@@ -27,6 +230,35 @@ def setup_logging(logger_settings: dict[str, str]) -> None:
     for filename, logger_name in loggers:
         logger = getLogger(logger_name)
         logger.setLevel(logger_settings["LOG_LEVEL"])
-        handler = FileHandler(filename)
+
+        handler = BatchFileHandler(
+            filename,
+            max_bytes=logger_settings["LOG_MAX_BYTES"],
+            backup_count=logger_settings["LOG_BACKUP_COUNT"],
+            interval=logger_settings["LOG_ROTATE_INTERVAL"],
+        )
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+
+        record_queue: queue.Queue = queue.Queue(logger_settings["LOG_QUEUE_SIZE"])
+        queue_handler = DroppingQueueHandler(record_queue)
+        queue_handler.name = logger_name
+        logger.addHandler(queue_handler)
+
+        listener = BatchingQueueListener(
+            record_queue,
+            handler,
+            queue_handler,
+            batch_size=logger_settings["LOG_BATCH_SIZE"],
+            flush_interval=logger_settings["LOG_FLUSH_INTERVAL"],
+        )
+        listener.start()
+        _listeners.append(listener)
+
+
+def shutdown_logging() -> None:
+    """Writes the queued log records and stops the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,312 @@
+"""Metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are kept in memory per process; with several workers
+every worker exposes its own. Values that other modules already count, like the cache
+hits, are read when the metrics are collected instead of being counted twice.
+"""
+
+from __future__ import annotations
+
+import bisect
+import time
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    """Escapes a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Formats label pairs as {name="value",...}, or nothing without labels."""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Metric:
+    """Base class of the metrics.
+
+    Attributes:
+        name: The metric name.
+        documentation: The help text.
+        labelnames: The names of the labels, their values are passed positionally.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """Yields (suffix, formatted labels, value) for every sample."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Returns the metric in the text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{labels} {value:g}" for suffix, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Increments the counter of the given label values."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        for labels, value in self._values.items():
+            yield "", _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Decrements the gauge of the given label values."""
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        """Sets the gauge of the given label values."""
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Counts observations, like durations, in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of every bucket plus +Inf, and the sum.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Records an observation for the given label values."""
+        counts, total = self._values.setdefault(
+            labels, ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels((*self.labelnames, "le"), (*labels, le))
+                yield "_bucket", bucket_labels, cumulative
+            formatted = _format_labels(self.labelnames, labels)
+            yield "_sum", formatted, total[0]
+            yield "_count", formatted, cumulative
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose values are read from a callback on every collection.
+
+    The callback returns a mapping from label values to values.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+        type_name: str = "gauge",
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        for labels, value in self.callback().items():
+            yield "", _format_labels(self.labelnames, labels), value
+
+
+class Registry:
+    """The metrics of the process."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Adds a metric, replacing one with the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Returns all metrics in the text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route and status.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being handled.")
+)
+db_queries = registry.register(
+    Counter("db_queries_total", "Database statements by kind.", ("statement",))
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Database statement latency by kind.",
+        ("statement",),
+        buckets=QUERY_BUCKETS,
+    )
+)
+
+
+def register_caches(caches: dict[str, Callable[[], dict[str, int]]]) -> None:
+    """Exposes the counters of caches that count their own hits and misses.
+
+    Args:
+        caches: The stats method of every cache, by cache name.
+
+    """
+
+    def lookups() -> dict[tuple[str, ...], float]:
+        values: dict[tuple[str, ...], float] = {}
+        for name, stats in caches.items():
+            counters = stats()
+            values[(name, "hit")] = counters["hits"]
+            values[(name, "miss")] = counters["misses"]
+        return values
+
+    registry.register(
+        CallbackMetric(
+            "cache_lookups_total",
+            "Cache lookups by cache and result.",
+            lookups,
+            ("cache", "result"),
+            type_name="counter",
+        )
+    )
+    registry.register(
+        CallbackMetric(
+            "cache_entries",
+            "Entries held by each cache.",
+            lambda: {(name,): stats()["entries"] for name, stats in caches.items()},
+            ("cache",),
+        )
+    )
+
+
+def _route_template(scope: dict) -> str:
+    """Returns the path template of the matched route, so paths with IDs share a series."""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency, status and concurrency of HTTP requests.
+
+    Durations are measured until the last body chunk was sent, so streamed responses
+    count in full.
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = "500"
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            method, route = scope["method"], _route_template(scope)
+            http_requests.inc(method, route, status_code)
+            http_request_duration.observe(duration, method, route)
+
+
+def _statement_kind(statement: str) -> str:
+    """Returns the SQL verb of a statement, e.g. SELECT."""
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Counts and times the statements executed by an engine.
+
+    Args:
+        engine: The engine to instrument.
+
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_times"].pop()
+        kind = _statement_kind(statement)
+        db_queries.inc(kind)
+        db_query_duration.observe(duration, kind)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def discard_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_times"):
+            connection.info["query_start_times"].pop()
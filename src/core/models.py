@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, ForeignKey
+from sqlalchemy import Column, DateTime, Index, Integer, String, ForeignKey
 from sqlalchemy.sql import func
 
 from src.database.database import DeclarativeBase
@@ -24,6 +24,9 @@ class User(BaseModel):
     """Definition of the user model."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_name", "name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -34,6 +37,10 @@ class Post(BaseModel):
     """Definition of the post model."""
 
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_name", "name", unique=True),
+        Index("ix_posts_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -12,6 +12,12 @@ class Descriptions(str, Enum):
     """
     post_id = "Unique id of post"
     user_id = "Unique id of user"
+    post_ids = "Unique ids of posts"
+    user_ids = "Unique ids of users"
+    limit = "Maximum number of items to return, ordered by id"
+    after = "Only return items with an id greater than this cursor"
+    stream = "Stream all items as newline delimited JSON"
+    since = "Only return items created at or after this time"
 
 
 def get_openapi_tags_metadata() -> list[dict[str, str]]:
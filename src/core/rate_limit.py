@@ -0,0 +1,34 @@
+"""Token bucket rate limiting."""
+
+import time
+
+
+class TokenBucket:
+    """Allows bursts of up to `burst` actions and `rate` actions per second on average.
+
+    Attributes:
+        rejected: The number of actions that were not allowed.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.rejected = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        """Takes a token if one is available.
+
+        Returns:
+            Whether the action is allowed.
+
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.rejected += 1
+        return False
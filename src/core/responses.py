@@ -0,0 +1,155 @@
+"""Response helpers shared by the list endpoints."""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, AsyncIterator, Optional, Sequence, Type
+
+from fastapi import Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Clients may keep responses but have to revalidate them on every use.
+CACHE_CONTROL = "no-cache"
+
+
+def set_next_cursor(response: Response, page: Sequence, limit: int) -> None:
+    """Sets the cursor of the next page on the response if the page is full.
+
+    Args:
+        response: The response to set the header on.
+        page: The rows of the current page.
+        limit: The requested page size.
+
+    """
+    if len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(page[-1].id)
+
+
+def json_rows_response(rows: list[dict[str, Any]], adapter: TypeAdapter) -> Response:
+    """Writes rows to a JSON response with a precompiled serializer.
+
+    The rows are not validated against the response model; they must already be in its
+    shape, see crud.get_rows.
+
+    Args:
+        rows: The rows to serialize.
+        adapter: The serializer of a list of rows.
+
+    Returns:
+        The JSON response.
+
+    """
+    return Response(adapter.dump_json(rows), media_type="application/json")
+
+
+def ndjson_response(
+    chunks: AsyncIterator[Sequence], schema: Type[BaseModel]
+) -> StreamingResponse:
+    """Streams chunks of rows as newline delimited JSON, one chunk at a time.
+
+    Args:
+        chunks: The chunks of rows to stream.
+        schema: The output schema to serialize every row with.
+
+    Returns:
+        The streaming response.
+
+    """
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            yield b"".join(
+                schema.model_validate(row).model_dump_json().encode() + b"\n"
+                for row in chunk
+            )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def make_etag(version: str) -> str:
+    """Returns a strong ETag for a version, see crud.get_version."""
+    return f'"{version}"'
+
+
+def _http_date(value: datetime) -> str:
+    """Formats a time as an HTTP date; naive times are taken to be UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    exists: bool = True,
+) -> bool:
+    """Returns whether the copy the client has cached is still current.
+
+    If-None-Match takes precedence; If-Modified-Since is only evaluated when there is no
+    If-None-Match header and the time of the last modification is known.
+
+    Args:
+        request: The request.
+        etag: The current ETag of the resource.
+        last_modified: The time the resource was last modified, if known.
+        exists: Whether the resource is known to exist. "If-None-Match: *" only matches
+            a resource that exists, so pass False when checking before the lookup.
+
+    Returns:
+        True if a 304 Not Modified response can be sent.
+
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return ("*" in tags and exists) or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have a precision of one second.
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: Optional[datetime] = None
+) -> None:
+    """Sets the ETag, Last-Modified and Cache-Control headers on a response.
+
+    Args:
+        response: The response to set the headers on.
+        etag: The ETag of the resource.
+        last_modified: The time the resource was last modified, if known.
+
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Returns a 304 Not Modified response with the validators of the resource.
+
+    Args:
+        etag: The ETag of the resource.
+        last_modified: The time the resource was last modified, if known.
+
+    Returns:
+        The empty response.
+
+    """
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
@@ -3,7 +3,8 @@ from __future__ import annotations
 from datetime import datetime
 from typing import ClassVar, Optional, Type, Union
 
-from pydantic import BaseModel, Field, field_serializer
+from pydantic import BaseModel, Field, TypeAdapter, field_serializer
+from typing_extensions import TypedDict
 
 
 def make_all_fields_optional(schema: Type[BaseModel]) -> dict:
@@ -85,3 +86,54 @@ class UserInputSchema(BaseModel):
 
 class UserOutputSchema(BaseOutputSchema, UserInputSchema):
     model_config: ClassVar[dict] = {"from_attributes": True}
+
+
+class UserPublicSchema(BaseOutputSchema):
+    """A user without the password, as broadcast to websocket subscribers."""
+
+    model_config: ClassVar[dict] = {"from_attributes": True}
+
+    name: str = Field(
+        ...,
+        title="Name",
+        description="The name of the user.",
+    )
+
+
+class PostRow(TypedDict):
+    """A post as selected for the fast JSON responses, in the field order and with the
+    types of PostOutputSchema; the id is already selected as text."""
+
+    name: str
+    content: str
+    user_id: int
+    id: str
+    created_at: datetime
+
+
+class UserRow(TypedDict):
+    """A user as selected for the fast JSON responses, in the field order and with the
+    types of UserOutputSchema; the id is already selected as text."""
+
+    name: str
+    password: str
+    id: str
+    created_at: datetime
+
+
+# Precompiled serializers, they write rows to JSON bytes without creating model instances.
+post_rows_adapter = TypeAdapter(list[PostRow])
+user_rows_adapter = TypeAdapter(list[UserRow])
+
+
+class BulkDeleteResultSchema(BaseModel):
+    id: str = Field(
+        ...,
+        title="Id",
+        description="The internal primary key.",
+    )
+    deleted: bool = Field(
+        ...,
+        title="Deleted",
+        description="Whether the model existed and was deleted.",
+    )
@@ -0,0 +1,57 @@
+"""In-memory copies of tables that are kept current by change events."""
+
+from __future__ import annotations
+
+import logging
+from typing import Awaitable, Callable, Iterable
+
+from src.core.config import get_settings
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+
+class LiveSnapshot:
+    """The rows of a table as JSON compatible dicts, ordered by id.
+
+    The rows are loaded once, on first use, and then kept current by applying the
+    changes that are broadcast, so reading the snapshot does not touch the database.
+    Loading and applying changes must not interleave; the owner serializes them.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[list[dict]]]) -> None:
+        self.loader = loader
+        self._rows: dict[int, dict] | None = None
+        self._sorted = True
+
+    async def rows(self) -> list[dict]:
+        """Returns the rows, loading them if they are not in memory."""
+        if self._rows is None:
+            rows = await self.loader()
+            self._rows = {int(row["id"]): row for row in rows}
+            self._sorted = False
+            logger.debug(f"Loaded a snapshot of {len(rows)} rows.")
+        if not self._sorted:
+            self._rows = dict(sorted(self._rows.items()))
+            self._sorted = True
+        return list(self._rows.values())
+
+    def upsert(self, rows: Iterable[dict]) -> None:
+        """Adds or replaces rows. Ignored while the rows are not in memory."""
+        if self._rows is None:
+            return
+        for row in rows:
+            key = int(row["id"])
+            if self._rows and key < next(reversed(self._rows)):
+                self._sorted = False
+            self._rows[key] = row
+
+    def remove(self, ids: Iterable[str | int]) -> None:
+        """Removes rows by id. Ignored while the rows are not in memory."""
+        if self._rows is None:
+            return
+        for id_ in ids:
+            self._rows.pop(int(id_), None)
+
+    def invalidate(self) -> None:
+        """Drops the rows, they are loaded again on next use."""
+        self._rows = None
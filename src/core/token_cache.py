@@ -0,0 +1,147 @@
+"""Cache of bearer tokens that have already been verified against the database."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from src.core.config import get_settings
+
+
+class VerifiedToken(NamedTuple):
+    """A verified token.
+
+    Attributes:
+        user_id: The id of the user the token belongs to.
+        name: The name of the user the token belongs to.
+        expires_at: The unix time after which the token must be verified again.
+    """
+
+    user_id: int
+    name: str
+    expires_at: float
+
+
+class VerifiedTokenCache:
+    """A bounded LRU cache of verified tokens, keyed by a digest of the token.
+
+    Entries expire with the exp claim of their token or after the TTL, whichever comes
+    first. Entries of a user are removed when that user is deleted in this process; other
+    processes keep them until they expire.
+
+    A token verified before its user was invalidated must not be cached afterwards, so
+    callers read `generation` before looking the user up and pass it to `add`, which skips
+    the token if the user was invalidated since. The generations of the last `max_entries`
+    invalidated users are kept; a token verified before an older invalidation is skipped.
+
+    Attributes:
+        hits: The number of tokens served from the cache.
+        misses: The number of tokens that had to be verified.
+        generation: The number of invalidations so far.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: OrderedDict[str, VerifiedToken] = OrderedDict()
+        # The generation each user was last invalidated at, and the latest generation of
+        # an invalidation that is no longer kept.
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._forgotten = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        """Returns the key of a token, so the cache never holds tokens themselves."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> VerifiedToken | None:
+        """Returns the verified token if it is cached and has not expired.
+
+        Args:
+            token: The bearer token.
+
+        Returns:
+            The verified token or None.
+
+        """
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def add(
+        self,
+        token: str,
+        user_id: int,
+        name: str,
+        exp: float | None = None,
+        generation: int | None = None,
+    ) -> None:
+        """Caches a token that has been verified.
+
+        Args:
+            token: The bearer token.
+            user_id: The id of the user the token belongs to.
+            name: The name of the user the token belongs to.
+            exp: The exp claim of the token, if it has one.
+            generation: The generation read before the user was looked up. The token is
+                not cached if the user may have been invalidated since.
+
+        """
+        if generation is not None and (
+            self._forgotten > generation or self._invalidated.get(user_id, 0) > generation
+        ):
+            return
+
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+
+        key = self.digest(token)
+        self._entries[key] = VerifiedToken(user_id, name, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Removes all tokens of a user.
+
+        Args:
+            user_id: The id of the user.
+
+        """
+        self.generation += 1
+        self._invalidated[user_id] = self.generation
+        self._invalidated.move_to_end(user_id)
+        if len(self._invalidated) > self.max_entries:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+        for key in [key for key, entry in self._entries.items() if entry.user_id == user_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Removes all tokens."""
+        self.generation += 1
+        self._forgotten = self.generation
+        self._invalidated.clear()
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit and miss counters and the number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+verified_tokens = VerifiedTokenCache(
+    max_entries=get_settings().TOKEN_CACHE_MAX_ENTRIES,
+    ttl=get_settings().TOKEN_CACHE_TTL,
+)
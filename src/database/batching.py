@@ -0,0 +1,155 @@
+"""Group commit of concurrent writes."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.core.metrics import CallbackMetric, registry
+from src.database.database import AsyncSessionLocal
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteBatcher:
+    """Runs concurrent write operations in shared transactions.
+
+    Operations submitted while a batch is being committed, or within `max_latency`
+    seconds of the first one, are run one after another in a single transaction with a
+    single commit, so they share one write lock and one sync to disk. A batch holds at
+    most `max_batch_size` operations; a full batch starts without waiting.
+
+    When an operation of a batch fails, the batch is rolled back and every operation of
+    it is run again in a transaction of its own, so each caller receives its own result or
+    error and no operation is affected by another.
+
+    Attributes:
+        batches: The number of transactions committed for batches.
+        operations: The number of operations committed in batches.
+        fallbacks: The number of batches that were rolled back and run one by one.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_latency: float,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.session_factory = session_factory
+        self.batches = 0
+        self.operations = 0
+        self.fallbacks = 0
+        self._pending: list[tuple[WriteOperation, asyncio.Future]] = []
+        self._full: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """Runs a write operation in the next batch and waits until it was committed.
+
+        Args:
+            operation: Writes with the session it is given, without committing.
+
+        Returns:
+            The return value of the operation.
+
+        Raises:
+            The exception the operation raised, or the one raised when committing it.
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, future))
+        if len(self._pending) >= self.max_batch_size and self._full is not None:
+            self._full.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    def stats(self) -> dict[str, int]:
+        """Returns the batch, operation and fallback counters."""
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _run(self) -> None:
+        """Commits batches until no operations are pending."""
+        # Created here, so that it belongs to the running event loop.
+        self._full = asyncio.Event()
+        try:
+            while self._pending:
+                if self.max_latency > 0 and len(self._pending) < self.max_batch_size:
+                    self._full.clear()
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.max_latency)
+                    except asyncio.TimeoutError:
+                        pass
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                if len(batch) == 1:
+                    await self._run_alone(*batch[0])
+                else:
+                    await self._run_batch(batch)
+        finally:
+            self._task = None
+            self._full = None
+
+    async def _run_batch(self, batch: list[tuple[WriteOperation, asyncio.Future]]) -> None:
+        """Runs the operations in one transaction, or one by one if one of them fails."""
+        results = []
+        try:
+            async with self.session_factory() as session:
+                for operation, _ in batch:
+                    results.append(await operation(session))
+                await session.commit()
+        except Exception as error:  # pylint: disable=broad-except
+            logger.info(f"Batch of {len(batch)} writes failed, writing one by one: {error!r}.")
+            self.fallbacks += 1
+            for operation, future in batch:
+                await self._run_alone(operation, future)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        logger.debug(f"Committed a batch of {len(batch)} writes.")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_alone(self, operation: WriteOperation, future: asyncio.Future) -> None:
+        """Runs one operation in a transaction of its own."""
+        try:
+            async with self.session_factory() as session:
+                result = await operation(session)
+                await session.commit()
+        except Exception as error:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(error)
+            return
+        if not future.done():
+            future.set_result(result)
+
+
+write_batcher = WriteBatcher(
+    max_batch_size=get_settings().WRITE_BATCH_MAX_SIZE,
+    max_latency=get_settings().WRITE_BATCH_MAX_LATENCY,
+)
+
+registry.register(
+    CallbackMetric(
+        "db_write_batches_total",
+        "Batched write transactions committed, writes committed in them and batches "
+        "written one by one after a failure.",
+        lambda: {(name,): value for name, value in write_batcher.stats().items()},
+        ("counter",),
+        type_name="counter",
+    )
+)
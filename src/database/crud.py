@@ -3,50 +3,300 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
-from typing import Any, Callable, Iterable, Type
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Type
 
 from fastapi import HTTPException, status
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import Column, Row, String, cast, event, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlalchemy.sql.elements import BinaryExpression
 from sqlalchemy.sql.operators import ColumnOperators
 
 from src.core.config import get_settings
 from src.core.models import BaseModel
+from src.database.retry import CircuitOpenError, retry_policy
 
 logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
 
+_INVALIDATED_ROWS = "invalidated_rows"
+_DELETE_CHUNK_SIZE = 500
+
+
+class ReadThroughCache:
+    """An async-safe LRU cache with TTL expiry and single-flight loading.
+
+    Keys start with the name of the table they were read from. Entries that hold rows
+    are stored with the ids of those rows and only evicted when one of them is written
+    to; other entries of a table, such as lists, are evicted by every write to it.
+    Concurrent misses for the same key share a single load; when the caller running the
+    load is cancelled, the others load the value again. A load that started before a
+    write to its table is returned to its callers but not stored.
+
+    Entries are invalidated by writes in this process and by the writes other processes
+    broadcast; entries loaded before a missed broadcast expire after the TTL.
+
+    Attributes:
+        hits: The number of lookups served from the cache.
+        misses: The number of lookups that had to be loaded.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any, tuple]] = OrderedDict()
+        self._loading: dict[tuple, asyncio.Future] = {}
+        # The keys depending on each row, by table and id, and on a table as a whole.
+        self._row_keys: dict[tuple[str, int], set[tuple]] = {}
+        self._table_keys: dict[str, set[tuple]] = {}
+        # Loads that started before the generation of their table changed are not stored.
+        self._generations: dict[str, int] = {}
+        # The versions of the tables, for ETags; they change with every write.
+        self._versions: dict[str, int] = {}
+
+    async def get_or_load(
+        self,
+        key: tuple,
+        loader: Callable[[], Awaitable[Any]],
+        row_ids: Callable[[Any], Iterable[int]] | None = None,
+    ) -> Any:
+        """Returns the cached value for a key, loading it on a miss.
+
+        Args:
+            key: The key, starting with the table name.
+            loader: Loads the value on a miss.
+            row_ids: Returns the ids of the rows a loaded value holds. Without it, the
+                value is evicted by every write to the table.
+
+        Returns:
+            The cached or loaded value.
+
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value, _ = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._discard(key)
+
+        self.misses += 1
+        if key in self._loading:
+            shared = self._loading[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not shared.cancelled() or (task is not None and task.cancelling()):
+                    raise
+            # The caller that was loading the value was cancelled, load it again, as the
+            # new leader unless another follower already took over.
+            return await self.get_or_load(key, loader, row_ids)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generations.get(key[0], 0)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()  # Mark as retrieved in case nobody else waits on it.
+            raise
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+        if self._generations.get(key[0], 0) == generation:
+            self._store(key, value, None if row_ids is None else row_ids(value))
+        future.set_result(value)
+        return value
+
+    def invalidate_rows(self, table: str, ids: Iterable[int]) -> None:
+        """Removes the entries holding rows of a table, and those without rows.
+
+        Loads of the table that are in flight are not stored, and later lookups do not
+        share them.
+
+        Args:
+            table: The name of the table.
+            ids: The ids of the rows that were written to.
+
+        """
+        self._generations[table] = self._generations.get(table, 0) + 1
+        self._versions[table] = self._versions.get(table, 0) + 1
+        for key in list(self._table_keys.get(table, ())):
+            self._discard(key)
+        for id_ in ids:
+            for key in list(self._row_keys.get((table, id_), ())):
+                self._discard(key)
+        for key in [key for key in self._loading if key[0] == table]:
+            del self._loading[key]
+
+    def invalidate(self, table: str) -> None:
+        """Removes all entries of a table and discards loads of it that are in flight.
+
+        Args:
+            table: The name of the table.
+
+        """
+        self.invalidate_rows(table, ())
+        for key in [key for key in self._entries if key[0] == table]:
+            self._discard(key)
+
+    def version(self, table: str) -> int:
+        """Returns how often a table was invalidated, which changes with every write."""
+        return self._versions.get(table, 0)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit and miss counters and the number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _store(self, key: tuple, value: Any, ids: Iterable[int] | None) -> None:
+        """Stores an entry and indexes it by the rows it holds, or by its table."""
+        self._discard(key)
+        table = key[0]
+        rows = () if ids is None else tuple((table, id_) for id_ in ids)
+        self._entries[key] = (time.monotonic() + self.ttl, value, rows)
+        if not rows:
+            self._table_keys.setdefault(table, set()).add(key)
+        for row in rows:
+            self._row_keys.setdefault(row, set()).add(key)
+        if len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: tuple) -> None:
+        """Removes an entry and its index references, if it is cached."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        rows = entry[2]
+        if not rows:
+            self._table_keys.get(key[0], set()).discard(key)
+        for row in rows:
+            keys = self._row_keys.get(row)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._row_keys[row]
+
+
+cache = ReadThroughCache(
+    max_entries=get_settings().CACHE_MAX_ENTRIES,
+    ttl=get_settings().CACHE_TTL,
+)
+
+
+# Tells the table versions of this process apart from those of other processes and of
+# earlier runs, which count from zero as well.
+_VERSION_EPOCH = uuid.uuid4().hex[:12]
+
+
+def get_version(*models: type[BaseModel]) -> str:
+    """Returns a version of tables that changes with every write to them.
+
+    The version is read from memory. Writes through crud and writes broadcast by other
+    processes invalidate the table, and so change its version.
+
+    Args:
+        models: The model classes of the tables.
+
+    Returns:
+        The version, to be used in an ETag.
+
+    """
+    versions = (str(cache.version(model.__tablename__)) for model in models)
+    return ".".join([_VERSION_EPOCH, *versions])
+
+
+def _invalidate(table: str, session: AsyncSession, ids: Iterable[int]) -> None:
+    """Invalidates written rows of a table now and again once the session commits.
+
+    Invalidating on commit as well drops entries that were loaded by other sessions
+    between the write and the commit, while the write was not yet visible to them.
+    """
+    ids = list(ids)
+    cache.invalidate_rows(table, ids)
+    session.info.setdefault(_INVALIDATED_ROWS, {}).setdefault(table, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    for table, ids in session.info.pop(_INVALIDATED_ROWS, {}).items():
+        cache.invalidate_rows(table, ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_invalidations(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_INVALIDATED_ROWS, None)
+
 
 def _retry_sql_alchemy_error(
     function: Callable,
 ) -> Callable:
-    """Decorator to retry a function if it raises a SQLAlchemy error.
+    """Decorator to retry a function if it fails for a transient reason.
+
+    Locked databases, lost connections and pool timeouts are retried after rolling back
+    the session, with the backoff, deadline and circuit breaker of retry_policy. Other
+    errors, such as integrity errors, are raised at once. A function is not retried when
+    its session already holds writes of earlier calls, which the rollback would discard;
+    the caller sees the error instead.
 
     Args:
-        function: The function to retry.
+        function: The function to retry, with the session as argument.
 
     Returns:
         The return value of the function.
 
-    Notes:
-        There seems to be an occasional SQLAlchemy error when calling the
-        database after a long period of inactivity on police infrastructure.
-        This decorator will retry the function if it raises an SQLAlchemy error.
+    Raises:
+        503: If the circuit breaker suspended database calls.
 
     """
 
+    @functools.wraps(function)
     async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        session = kwargs.get("session")
+        if session is None:
+            session = next((arg for arg in args if isinstance(arg, AsyncSession)), None)
+        rollback = None
+        if session is not None and not session.info.get(_INVALIDATED_ROWS):
+            rollback = session.rollback
+
         try:
-            return await function(*args, **kwargs)
-        except SQLAlchemyError as error:
-            logger.error(f"SQLAlchemy error: {error}.")
-            await asyncio.sleep(0.5)
-            return await function(*args, **kwargs)
+            return await retry_policy.call(lambda: function(*args, **kwargs), rollback)
+        except CircuitOpenError as error:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The database is temporarily unavailable.",
+                headers={"Retry-After": str(math.ceil(error.retry_after))},
+            ) from error
 
     return wrapper
 
 
+async def _raise_conflict(
+    model: type[BaseModel], session: AsyncSession, error: IntegrityError
+) -> None:
+    """Rolls back the session and raises a 409 for a violated constraint."""
+    logger.error(f"Integrity error creating {model.__name__}: {error.orig}.")
+    await session.rollback()
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"{model.__name__} conflicts with an existing one.",
+    )
+
+
 @_retry_sql_alchemy_error
 async def get(
     model: type[BaseModel],
@@ -95,26 +345,213 @@ async def get(
 
 
 @_retry_sql_alchemy_error
-async def create(new_model: BaseModel, session: AsyncSession) -> BaseModel:
-    """Create a model.
+async def get_rows(
+    model: type[BaseModel],
+    session: AsyncSession,
+    query: Iterable[BinaryExpression],
+    fields: Iterable[str],
+) -> list[dict[str, Any]]:
+    """Get models as dicts, without building ORM instances or output models.
+
+    The id is selected as text, the way the output schemas serialize it, so the rows can
+    be written to JSON as they are.
+
+    Args:
+        model: The model class.
+        session: The database session.
+        query: The arguments to filter by.
+        fields: The columns to select, in the order of the output schema.
+
+    Returns:
+        The rows as dicts with the fields as keys.
+
+    Raises:
+        500: If the connection to the database fails.
+
+    """
+    logger.debug(f"Querying rows of {model.__name__}.")
+    fields = list(fields)
+    table = model.__table__
+    columns = [
+        cast(table.c[field], String).label(field) if field == "id" else table.c[field]
+        for field in fields
+    ]
+
+    results = await session.execute(select(*columns).where(*query))
+    return [dict(zip(fields, row)) for row in results]
+
+
+async def get_by(
+    model: type[BaseModel],
+    session: AsyncSession,
+    column: Column,
+    value: Hashable,
+) -> BaseModel:
+    """Get the single model whose column equals a value, through the read-through cache.
+
+    Args:
+        model: The model class.
+        session: The database session.
+        column: The column to look up.
+        value: The value of the column.
+
+    Returns:
+        Instance of the queried model.
+
+    Raises:
+        404: If no model is found.
+        406: If more than one model is found.
+        500: If the connection to the database fails.
+
+    """
+    result = await cache.get_or_load(
+        (model.__tablename__, column.key, value),
+        lambda: get(model, session, [column == value], expected_count=1),
+        row_ids=lambda rows: [row.id for row in rows],
+    )
+    return result[0]
+
+
+@_retry_sql_alchemy_error
+async def get_page(
+    model: type[BaseModel],
+    session: AsyncSession,
+    query: Iterable[
+        Type[BinaryExpression] | Type[ColumnOperators]
+    ],
+    limit: int,
+    after: int | None = None,
+) -> list[BaseModel]:
+    """Get a page of models ordered by id, using the id as keyset cursor.
+
+    Args:
+        model: The model class.
+        session: The database session.
+        query: The arguments to filter by.
+        limit: The maximum number of results.
+        after: Only models with an id greater than this cursor are returned.
+
+    Returns:
+        List of instances of the queried model.
+
+    Raises:
+        500: If the connection to the database fails.
+
+    """
+    logger.debug(f"Querying page of {limit} {model.__name__} after {after}.")
+    table = model.__table__
+
+    statement = table.select().where(*query)
+    if after is not None:
+        statement = statement.where(table.c.id > after)
+    results = await session.execute(statement.order_by(table.c.id).limit(limit))
+    return results.all()
+
+
+async def stream(
+    model: type[BaseModel],
+    session: AsyncSession,
+    query: Iterable[
+        Type[BinaryExpression] | Type[ColumnOperators]
+    ],
+    chunk_size: int,
+) -> AsyncIterator[list[BaseModel]]:
+    """Stream all models matching the query in chunks ordered by id.
+
+    Every chunk is a separate keyset query, so no more than one chunk is held in memory.
+
+    Args:
+        model: The model class.
+        session: The database session.
+        query: The arguments to filter by.
+        chunk_size: The number of models per chunk.
+
+    Yields:
+        Lists of at most chunk_size instances of the queried model.
+
+    """
+    query = list(query)
+    after = None
+    while True:
+        chunk = await get_page(model, session, query, limit=chunk_size, after=after)
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1].id
+
+
+@_retry_sql_alchemy_error
+async def create(new_model: BaseModel, session: AsyncSession) -> Row:
+    """Create a model with a single INSERT ... RETURNING statement.
+
+    The generated id and defaults are read back by the INSERT itself, instead of by a
+    separate SELECT. The model instance is not added to the session.
 
     Args:
         new_model: The model to create.
         session: The database session.
 
     Returns:
-        Instance of the created model.
+        The row of the created model.
 
     Raises:
+        409 If the model violates a unique constraint.
         500 If the connection to the database fails.
 
     """
-    logger.info(f"Creating {new_model.__class__.__name__}.")
-    session.add(new_model)
-    await session.flush()
-    await session.refresh(new_model)
+    model = new_model.__class__
+    logger.info(f"Creating {model.__name__}.")
+    table = model.__table__
+    values = {
+        column.key: getattr(new_model, column.key)
+        for column in table.c
+        if getattr(new_model, column.key) is not None
+    }
+    try:
+        results = await session.execute(insert(table).values(values).returning(*table.c))
+    except IntegrityError as error:
+        await _raise_conflict(model, session, error)
+    created = results.one()
+    _invalidate(model.__tablename__, session, [created.id])
+    return created
+
+
+@_retry_sql_alchemy_error
+async def create_many(
+    model: type[BaseModel],
+    session: AsyncSession,
+    values: list[dict[str, Any]],
+) -> list[BaseModel]:
+    """Create models with multi-row INSERT ... RETURNING statements.
+
+    Args:
+        model: The model class.
+        session: The database session.
+        values: The column values of every model to create.
+
+    Returns:
+        The created rows, in the order of the given values.
+
+    Raises:
+        409 If one of the models violates a unique constraint, none are created.
+        500 If the connection to the database fails.
 
-    return new_model
+    """
+    logger.info(f"Creating {len(values)} {model.__name__}.")
+    if not values:
+        return []
+
+    table = model.__table__
+    try:
+        results = await session.execute(
+            insert(table).returning(*table.c, sort_by_parameter_order=True), values
+        )
+    except IntegrityError as error:
+        await _raise_conflict(model, session, error)
+    created = results.all()
+    _invalidate(model.__tablename__, session, [row.id for row in created])
+    return created
 
 
 @_retry_sql_alchemy_error
@@ -122,8 +559,11 @@ async def delete(
     model: type[BaseModel],
     session: AsyncSession,
     query: Iterable[BinaryExpression],
-) -> str:
-    """Delete a model.
+) -> Row:
+    """Delete a model with a single DELETE ... RETURNING statement.
+
+    When the query does not match exactly one model, an error is raised and the caller
+    does not commit, so nothing is deleted.
 
     Args:
         model: The model class.
@@ -131,14 +571,67 @@ async def delete(
         query: The arguments to filter by.
 
     Returns:
-        "ok" if the model was deleted.
+        The row of the deleted model.
 
     Raises:
-        HTTPException: 500 If the connection to the database fails.
+        404: If no model is found.
+        406: If more than one model is found.
+        500: If the connection to the database fails.
 
     """
     logger.info(f"Deleting model: {model.__name__}.")
-    await get(model, session, query, expected_count=1)
-    await session.execute(model.__table__.delete().where(*query))
+    table = model.__table__
+    results = await session.execute(table.delete().where(*query).returning(*table.c))
+    deleted = results.all()
+    _invalidate(model.__tablename__, session, [row.id for row in deleted])
+
+    if len(deleted) == 1:
+        return deleted[0]
+
+    logger.error(f"Expected 1 {model.__name__} to delete but found {len(deleted)}.")
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not enough models match the query.",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        detail="Too many models match the query.",
+    )
+
+
+@_retry_sql_alchemy_error
+async def delete_many(
+    model: type[BaseModel],
+    session: AsyncSession,
+    ids: list[int],
+) -> list[Row]:
+    """Delete models by id with DELETE ... WHERE id IN (...) RETURNING statements.
+
+    The ids are deleted in chunks to stay below the bound parameter limit of SQLite.
 
-    return "ok"
+    Args:
+        model: The model class.
+        session: The database session.
+        ids: The ids of the models to delete.
+
+    Returns:
+        The rows of the models that existed and were deleted.
+
+    Raises:
+        500 If the connection to the database fails.
+
+    """
+    logger.info(f"Deleting {len(ids)} {model.__name__}.")
+    table = model.__table__
+
+    deleted = []
+    for start in range(0, len(ids), _DELETE_CHUNK_SIZE):
+        results = await session.execute(
+            table.delete()
+            .where(table.c.id.in_(ids[start:start + _DELETE_CHUNK_SIZE]))
+            .returning(*table.c)
+        )
+        deleted.extend(results.all())
+    _invalidate(model.__tablename__, session, [row.id for row in deleted])
+    return deleted
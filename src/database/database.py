@@ -1,21 +1,106 @@
 """Set up the database connection."""
 import logging
-from typing import Generator
+from typing import Any, Generator
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from src.core.config import get_settings
+from src.core.config import Settings, get_settings
 
 logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
 
+# Engine profiles, individual values can be overridden with the DATABASE_* settings.
+ENGINE_PROFILES: dict[str, dict[str, Any]] = {
+    # The SQLite defaults: rollback journal, so writers block readers.
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "busy_timeout": 5000,
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    # Write-ahead log, so readers do not block on the writer, and a pool sized for many
+    # concurrent readers. NORMAL is durable in WAL mode except for the last transactions
+    # before a power loss.
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "pool_size": 20,
+        "max_overflow": 20,
+    },
+}
 
-engine = create_async_engine(
-    "sqlite+aiosqlite:///test.db",
-    future=True,
-    echo=False,
-    connect_args={"check_same_thread": False},
-)
+
+def get_engine_profile(settings: Settings) -> dict[str, Any]:
+    """Returns the selected engine profile with the overrides from the settings applied.
+
+    Args:
+        settings: The application settings.
+
+    Returns:
+        The pragma and pool options.
+
+    """
+    overrides = {
+        "journal_mode": settings.DATABASE_JOURNAL_MODE,
+        "synchronous": settings.DATABASE_SYNCHRONOUS,
+        "mmap_size": settings.DATABASE_MMAP_SIZE,
+        "cache_size": settings.DATABASE_CACHE_SIZE,
+        "busy_timeout": settings.DATABASE_BUSY_TIMEOUT,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    }
+    profile = dict(ENGINE_PROFILES[settings.DATABASE_PROFILE])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    return profile
+
+
+def _create_engine(settings: Settings):
+    """Creates the engine and applies the engine profile to every new connection."""
+    profile = get_engine_profile(settings)
+    url = make_url(settings.DATABASE_URL)
+    options: dict[str, Any] = {}
+
+    # File databases get a connection pool, the driver's default opens a connection per
+    # session. In-memory databases keep the driver's single shared connection.
+    if url.database and url.database != ":memory:":
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+        )
+
+    new_engine = create_async_engine(
+        url,
+        future=True,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        **options,
+    )
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+        cursor.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        cursor.close()
+
+    logger.info(f"Using database engine profile {settings.DATABASE_PROFILE}: {profile}.")
+    return new_engine
+
+
+engine = _create_engine(get_settings())
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
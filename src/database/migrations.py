@@ -0,0 +1,132 @@
+"""Versioned schema migrations.
+
+The schema version is stored in the user_version field of the SQLite database header.
+Migrations are only ever appended to MIGRATIONS; a migration that was released is never
+changed, a new one is added instead. Every statement is idempotent, so databases that
+were created before versioning was introduced are migrated as well.
+"""
+
+import logging
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import get_settings
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+
+class Migration(NamedTuple):
+    """A schema migration.
+
+    Attributes:
+        version: The schema version after the migration has been applied.
+        description: What the migration changes.
+        statements: The SQL statements to apply.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "Create the users and posts tables.",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                content VARCHAR NOT NULL,
+                user_id INTEGER,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(user_id) REFERENCES users (id)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "Index the lookup columns and make user and post names unique. Fails if the "
+        "database already holds duplicate names, which have to be resolved first.",
+        (
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_name ON users (name)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_posts_name ON posts (name)",
+            "CREATE INDEX IF NOT EXISTS ix_posts_user_id ON posts (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_posts_created_at_id ON posts (created_at, id)",
+        ),
+    ),
+    Migration(
+        3,
+        "Drop the index of the posts by creation time, which no query of the API uses.",
+        ("DROP INDEX IF EXISTS ix_posts_created_at_id",),
+    ),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """Returns the schema version of the database.
+
+    Args:
+        engine: The database engine.
+
+    Returns:
+        The version of the last applied migration, 0 for a new database.
+
+    """
+    async with engine.connect() as connection:
+        result = await connection.exec_driver_sql("PRAGMA user_version")
+        return result.scalar()
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """Applies all pending migrations in one transaction.
+
+    When the schema is current no DDL is run. Otherwise the write lock is taken before the
+    version is checked again, so when several workers start at the same time one applies
+    the migrations and the others find the schema current.
+
+    Args:
+        engine: The database engine.
+
+    Returns:
+        The schema version of the database.
+
+    """
+    version = await get_schema_version(engine)
+    if version >= LATEST_VERSION:
+        logger.info(f"Database schema is at version {version}, nothing to migrate.")
+        return version
+
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql("BEGIN IMMEDIATE")
+        result = await connection.exec_driver_sql("PRAGMA user_version")
+        version = result.scalar()
+
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logger.info(f"Applying migration {migration.version}: {migration.description}")
+            for statement in migration.statements:
+                await connection.exec_driver_sql(statement)
+            version = migration.version
+
+        await connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+        await connection.commit()
+
+    logger.info(f"Database schema is at version {version}.")
+    return version
@@ -0,0 +1,259 @@
+"""Retries of database operations that failed for a transient reason."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.core.config import Settings, get_settings
+from src.core.metrics import CallbackMetric, Counter, registry
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+# Messages of the SQLite errors that can succeed when the operation is tried again.
+TRANSIENT_MESSAGES = (
+    "database is locked",
+    "database table is locked",
+    "database schema has changed",
+    "disk i/o error",
+    "unable to open database file",
+)
+
+db_retries = registry.register(
+    Counter(
+        "db_retries_total",
+        "Database operations that failed for a transient reason, by outcome.",
+        ("outcome",),
+    )
+)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Returns whether an error may not occur again when the operation is retried.
+
+    Lock contention, lost connections and pool timeouts are transient; constraint
+    violations and errors in statements are not.
+
+    Args:
+        error: The error raised by the operation.
+
+    Returns:
+        True if the operation is worth retrying.
+
+    """
+    if isinstance(error, (DisconnectionError, PoolTimeoutError)):
+        return True
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    if isinstance(error, OperationalError):
+        message = str(error.orig).lower()
+        return any(transient in message for transient in TRANSIENT_MESSAGES)
+    return False
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit breaker is open.
+
+    Attributes:
+        retry_after: The seconds until the database is tried again.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Database calls are suspended for {retry_after:.1f} s.")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Suspends database calls after repeated transient failures.
+
+    The circuit opens after `failure_threshold` operations in a row failed even after
+    their retries. While it is open, calls are rejected at once. After `reset_timeout`
+    seconds a single trial call is let through: if it succeeds the circuit closes,
+    otherwise it stays open for another `reset_timeout` seconds.
+
+    Attributes:
+        failures: The number of operations that failed in a row.
+        trips: The number of times the circuit opened.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently suspended."""
+        return self._opened_at is not None
+
+    def retry_after(self) -> float:
+        """Returns the seconds until the next trial call is let through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Returns whether a call may be made, letting one trial through when due."""
+        if self._opened_at is None:
+            return True
+        if self.retry_after() > 0:
+            return False
+        # Calls arriving while the trial runs wait for another reset_timeout.
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        """Closes the circuit."""
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Counts a failed operation, opening the circuit at the threshold."""
+        self.failures += 1
+        if self._opened_at is not None or self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.trips += 1
+                logger.error(
+                    f"Suspending database calls for {self.reset_timeout} s after "
+                    f"{self.failures} failed operations."
+                )
+            self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """Retries operations that failed for a transient reason with exponential backoff.
+
+    The n-th retry waits a random time between 0 and min(max_delay, base_delay * 2 ** n),
+    so callers that failed together do not retry together. No retry starts after the
+    deadline, measured from the first attempt.
+
+    Attributes:
+        max_attempts: The maximum number of attempts, including the first.
+        base_delay: The delay before the first retry is drawn from, in seconds.
+        max_delay: The maximum delay between attempts, in seconds.
+        deadline: The time after which no retry is started, in seconds.
+        breaker: The circuit breaker the outcomes are recorded with.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float,
+        breaker: CircuitBreaker,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker
+
+    def delay(self, retry: int) -> float:
+        """Returns the randomized delay before a retry, counting from 0."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    async def call(
+        self,
+        operation: Callable[[], Awaitable[Any]],
+        rollback: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Any:
+        """Runs an operation, retrying it while it fails for a transient reason.
+
+        Args:
+            operation: The operation to run.
+            rollback: Restores the state the operation needs before it is retried, e.g.
+                rolls back its session. Without it, the operation is not retried.
+
+        Returns:
+            The return value of the operation.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            The error of the last attempt, if it was not transient or no retry is left.
+
+        """
+        if not self.breaker.allow():
+            db_retries.inc("rejected")
+            raise CircuitOpenError(self.breaker.retry_after())
+
+        deadline = time.monotonic() + self.deadline
+        attempt = 1
+        while True:
+            try:
+                result = await operation()
+            except SQLAlchemyError as error:
+                if not is_transient(error):
+                    self.breaker.record_success()
+                    raise
+                delay = self.delay(attempt - 1)
+                if (
+                    rollback is None
+                    or attempt >= self.max_attempts
+                    or time.monotonic() + delay > deadline
+                ):
+                    logger.error(f"Database operation failed after {attempt} attempts: {error}.")
+                    db_retries.inc("exhausted")
+                    self.breaker.record_failure()
+                    raise
+                logger.warning(
+                    f"Transient database error on attempt {attempt}, retrying in "
+                    f"{delay * 1000:.0f} ms: {error}."
+                )
+                db_retries.inc("retried")
+                await rollback()
+                await asyncio.sleep(delay)
+                attempt += 1
+            except Exception:
+                # The database answered, the operation failed for another reason.
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+
+def create_retry_policy(settings: Settings) -> RetryPolicy:
+    """Creates the retry policy of the database from the settings.
+
+    Retries stop SERVICE_CONNECTION_TIMEOUT seconds after the first attempt and wait at
+    most SERVICE_CONNECTION_RETRY_DELAY seconds, which is also how long the circuit
+    breaker stays open.
+    """
+    return RetryPolicy(
+        max_attempts=settings.DATABASE_RETRY_ATTEMPTS,
+        base_delay=settings.DATABASE_RETRY_BASE_DELAY,
+        max_delay=settings.SERVICE_CONNECTION_RETRY_DELAY,
+        deadline=settings.SERVICE_CONNECTION_TIMEOUT,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.DATABASE_BREAKER_THRESHOLD,
+            reset_timeout=settings.SERVICE_CONNECTION_RETRY_DELAY,
+        ),
+    )
+
+
+retry_policy = create_retry_policy(get_settings())
+
+registry.register(
+    CallbackMetric(
+        "db_circuit_open",
+        "Whether database calls are suspended by the circuit breaker.",
+        lambda: {(): int(retry_policy.breaker.is_open)},
+    )
+)
+registry.register(
+    CallbackMetric(
+        "db_circuit_trips_total",
+        "Times the circuit breaker suspended database calls.",
+        lambda: {(): retry_policy.breaker.trips},
+        type_name="counter",
+    )
+)
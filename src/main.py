@@ -1,22 +1,39 @@
 import tracemalloc
+from typing import Literal, Optional
 
 import uvicorn
-from fastapi import FastAPI, APIRouter
-from fastapi import WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, APIRouter, Response
+from fastapi import WebSocket, WebSocketDisconnect, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import get_settings
+from src.core.encoding import Encoding
 from src.core.loggers import setup_logging
+from src.core.metrics import (
+    CONTENT_TYPE,
+    CallbackMetric,
+    MetricsMiddleware,
+    instrument_engine,
+    register_caches,
+    registry,
+)
 from src.core.openapi import get_openapi_tags_metadata
-from src.database.database import engine, DeclarativeBase
-from src.database.database import get_database
+from src.core.token_cache import verified_tokens
+from src.database.crud import cache
+from src.database.database import engine
+from src.database.migrations import migrate
 from src.routers.posts import views as posts_views
-from src.routers.posts.websockets import broadcast_list, websocket_connections
+from src.routers.posts.websockets import (
+    close_connection,
+    handle_message,
+    open_connection,
+    resume,
+    send_snapshot,
+    start_broadcasting,
+    stop_broadcasting,
+)
 from src.routers.users import views as users_views
 
-tracemalloc.start()
-
 views = [
     posts_views,
     users_views,
@@ -31,6 +48,13 @@ logger_settings = {
     "LOGGER_REQUESTS_NAME": get_settings().LOGGER_REQUESTS_NAME,
     "LOGGING_CONTROLLERS_FILE": get_settings().LOGGING_CONTROLLERS_FILE,
     "LOGGER_CONTROLLERS_NAME": get_settings().LOGGER_CONTROLLERS_NAME,
+    "LOG_FORMAT": get_settings().LOG_FORMAT,
+    "LOG_QUEUE_SIZE": get_settings().LOG_QUEUE_SIZE,
+    "LOG_BATCH_SIZE": get_settings().LOG_BATCH_SIZE,
+    "LOG_FLUSH_INTERVAL": get_settings().LOG_FLUSH_INTERVAL,
+    "LOG_MAX_BYTES": get_settings().LOG_MAX_BYTES,
+    "LOG_BACKUP_COUNT": get_settings().LOG_BACKUP_COUNT,
+    "LOG_ROTATE_INTERVAL": get_settings().LOG_ROTATE_INTERVAL,
 }
 setup_logging(logger_settings=logger_settings)
 
@@ -60,29 +84,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics, added last so the middleware also times the other middlewares.
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+register_caches({"query": cache.stats, "token": verified_tokens.stats})
+
+if get_settings().TRACEMALLOC:
+    tracemalloc.start()
+    registry.register(
+        CallbackMetric(
+            "python_traced_memory_bytes",
+            "Memory traced by tracemalloc.",
+            lambda: {(): tracemalloc.get_traced_memory()[0]},
+        )
+    )
+
+
+@app.get(f"{ROOT_PATH}/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 
 # Set up the database
 @app.on_event("startup")
 async def init_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(DeclarativeBase.metadata.drop_all)
-        await conn.run_sync(DeclarativeBase.metadata.create_all)
+    await migrate(engine)
+
+
+@app.on_event("startup")
+async def start_backplane():
+    await start_broadcasting()
+
+
+@app.on_event("shutdown")
+async def stop_backplane():
+    await stop_broadcasting()
 
 
 @app.websocket("/ws")
-async def websocket_endpoint_main(websocket: WebSocket, session: AsyncSession = Depends(get_database)):
+async def websocket_endpoint_main(
+    websocket: WebSocket,
+    mode: Literal["list", "delta"] = Query("list"),
+    topic: Optional[list[str]] = Query(None),
+    epoch: Optional[str] = Query(None),
+    last_seq: Optional[int] = Query(None, ge=0),
+    encoding: Encoding = Query("json"),
+    columnar: bool = Query(False),
+):
     await websocket.accept()
-    websocket_connections.add(websocket)
+    try:
+        connection = open_connection(
+            websocket, mode=mode, topics=topic, encoding=encoding, columnar=columnar
+        )
+    except ValueError as error:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(error))
+        return
 
     try:
+        if last_seq is not None:
+            await resume(connection, epoch, last_seq)
+        elif mode == "delta":
+            await send_snapshot(connection)
         while True:
             try:
-                data = await websocket.receive_text()
-                await broadcast_list(session)
+                await handle_message(connection, await websocket.receive_text())
             except WebSocketDisconnect:
                 break
     finally:
-        websocket_connections.remove(websocket)
+        await close_connection(connection)
 
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host="127.0.0.1", port=8000, reload=True)
+    # Compresses websocket frames for clients that offer permessage-deflate.
+    uvicorn.run(
+        "src.main:app",
+        host="127.0.0.1",
+        port=8000,
+        reload=True,
+        ws_per_message_deflate=True,
+    )
@@ -0,0 +1,163 @@
+"""Websocket connections with bounded outbound queues."""
+
+import asyncio
+import logging
+from typing import Any, Literal
+
+from fastapi import WebSocket, status
+
+from src.core.config import get_settings
+from src.core.encoding import Encoding, encode
+from src.core.rate_limit import TokenBucket
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+OverflowPolicy = Literal["drop_oldest", "latest", "disconnect"]
+ProtocolMode = Literal["list", "delta"]
+
+# Sent to a delta connection before the next frame once frames had to be discarded.
+RESYNC_REQUIRED = {"type": "resync_required"}
+
+
+class Connection:
+    """A websocket with a bounded outbound queue that is drained by its own writer task.
+
+    Publishers only enqueue frames, so they are never slowed down by a slow reader. When
+    the queue is full the overflow policy decides what happens:
+
+    - drop_oldest: the oldest queued frame is discarded to make room for the new one.
+    - latest: all queued frames are discarded, only the new frame is kept.
+    - disconnect: the websocket is closed.
+
+    A delta client cannot tell from the sequence numbers that events were discarded, since
+    it only receives the events of its topics, so it is sent a resync_required frame.
+
+    Attributes:
+        websocket: The underlying websocket.
+        mode: Whether the client receives full post lists or delta events.
+        topics: The topics the client is subscribed to.
+        limiter: Limits the rate of the messages the client may send, None for no limit.
+        encoding: How frames are encoded; JSON frames are sent as text, others as bytes.
+        columnar: Whether lists of posts and users are sent in the columnar layout.
+        dropped: The number of frames discarded because of the overflow policy.
+        closed: Whether the connection has been closed.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: int,
+        policy: OverflowPolicy,
+        send_timeout: float,
+        mode: ProtocolMode = "list",
+        limiter: TokenBucket | None = None,
+        encoding: Encoding = "json",
+        columnar: bool = False,
+    ) -> None:
+        self.websocket = websocket
+        self.mode = mode
+        self.topics: set[str] = set()
+        self.limiter = limiter
+        self.encoding = encoding
+        self.columnar = columnar
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.closed = False
+        self._lost = False
+        self._queue: asyncio.Queue[str | bytes] = asyncio.Queue(maxsize=max_size)
+        self._writer: asyncio.Task | None = None
+
+    @property
+    def frame_format(self) -> tuple[Encoding, bool]:
+        """The encoding and layout, connections with the same format share frames."""
+        return self.encoding, self.columnar
+
+    def encode(self, frame: Any) -> str | bytes:
+        """Encodes a JSON compatible frame in the encoding of the connection."""
+        return encode(frame, self.encoding)
+
+    def start(self) -> None:
+        """Starts the writer task."""
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, frame: str | bytes) -> bool:
+        """Enqueues a frame without waiting for the websocket.
+
+        Args:
+            frame: The encoded frame.
+
+        Returns:
+            False if the connection is closed or was closed because of the overflow
+            policy, True otherwise.
+
+        """
+        if self.closed:
+            return False
+
+        if self._queue.full():
+            if self.policy == "disconnect":
+                logger.warning("Websocket queue full, disconnecting slow consumer.")
+                self._shutdown()
+                asyncio.create_task(self._close_websocket(status.WS_1008_POLICY_VIOLATION))
+                return False
+            if self.policy == "latest":
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                    self.dropped += 1
+            else:
+                self._queue.get_nowait()
+                self.dropped += 1
+            self._lost = self.mode == "delta"
+
+        self._queue.put_nowait(frame)
+        return True
+
+    async def close(self, code: int = status.WS_1000_NORMAL_CLOSURE) -> None:
+        """Stops the writer task and closes the websocket if it is still open.
+
+        Args:
+            code: The websocket close code.
+
+        """
+        if self.closed:
+            return
+        self._shutdown()
+        await self._close_websocket(code)
+
+    def _shutdown(self) -> None:
+        """Marks the connection as closed and stops the writer task."""
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _close_websocket(self, code: int) -> None:
+        """Closes the websocket without waiting on it indefinitely."""
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Websocket was already closed.")
+
+    async def _send_frame(self, frame: str | bytes) -> None:
+        """Sends a frame as text or bytes, waiting at most the send timeout."""
+        if isinstance(frame, str):
+            send = self.websocket.send_text(frame)
+        else:
+            send = self.websocket.send_bytes(frame)
+        await asyncio.wait_for(send, timeout=self.send_timeout)
+
+    async def _write(self) -> None:
+        """Sends queued frames to the websocket until the connection is closed."""
+        while not self.closed:
+            frame = await self._queue.get()
+            try:
+                if self._lost:
+                    self._lost = False
+                    await self._send_frame(self.encode(RESYNC_REQUIRED))
+                await self._send_frame(frame)
+            except asyncio.TimeoutError:
+                logger.warning("Websocket send timed out, disconnecting slow consumer.")
+                await self.close(code=status.WS_1008_POLICY_VIOLATION)
+            except Exception as error:  # pylint: disable=broad-except
+                logger.warning(f"Websocket send failed: {error}.")
+                await self.close(code=status.WS_1011_INTERNAL_ERROR)
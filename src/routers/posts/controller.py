@@ -1,23 +1,49 @@
 import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator
 
-from fastapi import HTTPException, status
+from sqlalchemy import Row, String, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import get_settings
 from src.core.models import Post
-from src.core.schemas import PostInputSchema
-from src.database.crud import create, get, delete
-from src.routers.users.controller import get_user_by_name
+from src.core.schemas import PostInputSchema, PostOutputSchema
+from src.database.crud import (
+    create,
+    create_many,
+    get,
+    get_by,
+    get_rows,
+    get_page,
+    delete,
+    delete_many,
+    stream,
+)
+from src.database.batching import write_batcher
+from src.database.database import AsyncSessionLocal
+from src.routers.users.controller import get_user_by_id, get_user_by_name
 
 logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
 
 
-async def create_post(post_input: PostInputSchema, session: AsyncSession, username: str) -> Post:
-    """Creates a post."""
+async def create_post(post_input: PostInputSchema, session: AsyncSession, username: str) -> Row:
+    """Creates a post.
+
+    With WRITE_BATCHING, the post is committed together with the posts created and deleted
+    concurrently, see WriteBatcher.
+    """
     logger.debug("Creating post.")
 
     user = await get_user_by_name(username, session)
 
+    if get_settings().WRITE_BATCHING:
+        return await write_batcher.submit(
+            lambda batch_session: create(
+                new_model=Post(**post_input.model_dump()),
+                session=batch_session,
+            )
+        )
+
     new_post = await create(
         new_model=Post(**post_input.model_dump()),
         session=session,
@@ -26,6 +52,18 @@ async def create_post(post_input: PostInputSchema, session: AsyncSession, userna
     return new_post
 
 
+async def create_posts(post_inputs: list[PostInputSchema], session: AsyncSession) -> list[Post]:
+    """Creates posts in a single transaction."""
+    logger.debug(f"Creating {len(post_inputs)} posts.")
+    new_posts = await create_many(
+        Post,
+        session,
+        [post_input.model_dump() for post_input in post_inputs],
+    )
+    await session.commit()
+    return new_posts
+
+
 async def get_posts(session: AsyncSession) -> list[Post]:
     """Returns a list of all posts."""
     logger.debug("Getting all posts.")
@@ -38,26 +76,84 @@ async def get_posts(session: AsyncSession) -> list[Post]:
     return posts
 
 
+async def get_post_rows(session: AsyncSession) -> list[dict]:
+    """Returns all posts as dicts in the shape of PostOutputSchema."""
+    logger.debug("Getting the rows of all posts.")
+    return await get_rows(Post, session, [], PostOutputSchema.model_fields)
+
+
+async def get_posts_page(session: AsyncSession, limit: int, after: int | None) -> list[Post]:
+    """Returns a page of posts ordered by ID."""
+    logger.debug(f"Getting {limit} posts after {after}.")
+    return await get_page(Post, session, [], limit=limit, after=after)
+
+
+async def get_user_posts(
+    user_id: int,
+    session: AsyncSession,
+    limit: int,
+    after: int | None = None,
+    since: datetime | None = None,
+) -> list[Post]:
+    """Returns a page of the posts of a user ordered by ID, served by the user_id index.
+
+    Raises:
+        404: If the user does not exist.
+
+    """
+    logger.debug(f"Getting {limit} posts of user {user_id} after {after} since {since}.")
+    await get_user_by_id(user_id, session)
+
+    query = [Post.user_id == user_id]
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        # created_at is stored by SQLite as "YYYY-MM-DD HH:MM:SS" text, so the bound value
+        # is formatted the same way for the comparison to hold within the same second.
+        query.append(type_coerce(Post.created_at, String) >= since.isoformat(sep=" "))
+    return await get_page(Post, session, query, limit=limit, after=after)
+
+
+async def stream_posts() -> AsyncIterator[list[Post]]:
+    """Yields all posts in chunks ordered by ID.
+
+    Uses a session of its own, because the request session is closed before a streaming
+    response is sent.
+    """
+    async with AsyncSessionLocal() as session:
+        async for chunk in stream(Post, session, [], get_settings().STREAM_CHUNK_SIZE):
+            yield chunk
+
+
 async def get_post(post_id: int, session: AsyncSession) -> Post:
     """Returns a post selected by its ID."""
     logger.info(f"Getting post for {post_id}.")
 
-    result = await get(
-        Post,
-        session,
-        [Post.id == post_id],
-        expected_count=1,
-    )
+    return await get_by(Post, session, Post.id, post_id)
+
 
-    return result[0]
+async def delete_post(post_id: int, session: AsyncSession) -> Row:
+    """Deletes a post selected by its ID and returns it.
 
+    With WRITE_BATCHING, the deletion is committed together with concurrent writes.
+    """
+    if get_settings().WRITE_BATCHING:
+        return await write_batcher.submit(
+            lambda batch_session: delete(Post, batch_session, [Post.id == post_id])
+        )
 
-async def delete_post(post_id: int, session: AsyncSession) -> None:
-    """Deletes a post selected by its ID."""
-    await delete(Post, session, [Post.id == post_id])
+    deleted = await delete(Post, session, [Post.id == post_id])
     await session.commit()
+    return deleted
 
-    raise HTTPException(
-        status_code=status.HTTP_204_NO_CONTENT,
-        detail="The post has been deleted.",
-    )
+
+async def delete_posts(post_ids: list[int], session: AsyncSession) -> list[Row]:
+    """Deletes posts selected by their IDs in a single transaction.
+
+    Returns:
+        The rows of the posts that existed and were deleted.
+
+    """
+    deleted = await delete_many(Post, session, post_ids)
+    await session.commit()
+    return deleted
@@ -1,14 +1,48 @@
 """Contains endpoints for interacting with the posts table."""
+from typing import Optional
 
-from fastapi import APIRouter, Body, Path, Depends, status
+from fastapi import APIRouter, Body, Path, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.auth import decode_token
+from src.core.config import get_settings
 from src.core.openapi import Descriptions
-from src.core.schemas import PostOutputSchema, PostInputSchema
+from src.core.models import Post
+from src.core.responses import (
+    NEXT_CURSOR_HEADER,
+    is_not_modified,
+    json_rows_response,
+    make_etag,
+    ndjson_response,
+    not_modified_response,
+    set_next_cursor,
+    set_validators,
+)
+from src.core.schemas import (
+    BulkDeleteResultSchema,
+    PostOutputSchema,
+    PostInputSchema,
+    post_rows_adapter,
+)
+from src.database.crud import get_version
 from src.database.database import get_database
-from src.routers.posts.controller import create_post, get_posts, get_post, delete_post
-from src.routers.posts.websockets import broadcast_list
+from src.routers.posts.controller import (
+    create_post,
+    create_posts,
+    get_posts,
+    get_post_rows,
+    get_posts_page,
+    get_post,
+    delete_post,
+    delete_posts,
+    stream_posts,
+)
+from src.routers.posts.websockets import (
+    broadcast_post_created,
+    broadcast_post_deleted,
+    broadcast_posts_created,
+    broadcast_posts_deleted,
+)
 
 router = APIRouter(
     prefix="/posts",
@@ -23,6 +57,7 @@ router = APIRouter(
     status_code=status.HTTP_201_CREATED,
     responses={
         201: {"description": "Post created."},
+        409: {"description": "Post with this name already exists."},
         500: {"description": "Connection to the database failed."},
 
     },
@@ -37,29 +72,134 @@ async def create(
 
     created_post = await create_post(post_input=post, session=session, username=username)
 
-    await broadcast_list(session)
+    await broadcast_post_created(created_post)
 
     return created_post
 
 
+@router.post(
+    "/bulk",
+    summary="Create posts in bulk.",
+    description=(
+        "Create a batch of posts in a single transaction; it returns the created posts in "
+        "the order they were given."
+    ),
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        201: {"description": "Posts created."},
+        409: {"description": "Post with one of these names already exists."},
+        500: {"description": "Connection to the database failed."},
+    },
+    response_model=list[PostOutputSchema,],
+)
+async def create_bulk(
+    posts: list[PostInputSchema] = Body(
+        ...,
+        min_length=1,
+        max_length=get_settings().BULK_MAX_ITEMS,
+    ),
+    session: AsyncSession = Depends(get_database),
+    username: str = Depends(decode_token),
+) -> list[PostOutputSchema]:
+    """Creates posts in bulk."""
+
+    created_posts = await create_posts(post_inputs=posts, session=session)
+
+    await broadcast_posts_created(created_posts)
+
+    return created_posts
+
+
+@router.delete(
+    "/bulk",
+    summary="Delete posts in bulk.",
+    description=(
+        "This endpoint requires a list of post IDs; it deletes the posts with those IDs in "
+        "a single transaction and returns for every ID whether it was deleted."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Deletion result for every given ID."},
+        500: {"description": "Connection to the database failed."},
+    },
+    response_model=list[BulkDeleteResultSchema,],
+)
+async def delete_bulk(
+    post_ids: list[int] = Body(
+        ...,
+        min_length=1,
+        max_length=get_settings().BULK_MAX_ITEMS,
+        description=Descriptions.post_ids,
+    ),
+    session: AsyncSession = Depends(get_database),
+    username: str = Depends(decode_token),
+) -> list[BulkDeleteResultSchema]:
+    """Deletes posts in bulk."""
+    deleted = await delete_posts(post_ids, session)
+
+    if deleted:
+        await broadcast_posts_deleted(deleted)
+
+    deleted_ids = {row.id for row in deleted}
+    return [
+        BulkDeleteResultSchema(id=str(post_id), deleted=post_id in deleted_ids)
+        for post_id in post_ids
+    ]
+
+
 @router.get(
     "",
     summary="Get all posts.",
-    description="Get all posts.",
+    description=(
+        "Get all posts. Pass a limit to get a page ordered by ID; the "
+        f"{NEXT_CURSOR_HEADER} header then holds the cursor to pass as 'after' for "
+        "the next page. Pass stream=true to stream all posts as newline delimited JSON."
+    ),
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Posts retrieved."},
+        304: {"description": "Not modified since the given ETag or time."},
         404: {"description": "Too few models found."},
+        422: {"description": "A cursor was given without a limit."},
         406: {"description": "Too many models found."},
         500: {"description": "Connection to the database failed."},
     },
     response_model=list[PostOutputSchema,],
 )
 async def get_all(
-        session: AsyncSession = Depends(get_database),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, gt=0, le=1000, description=Descriptions.limit),
+    after: Optional[int] = Query(None, ge=0, description=Descriptions.after),
+    stream: bool = Query(False, description=Descriptions.stream),
+    session: AsyncSession = Depends(get_database),
 ) -> list[PostOutputSchema]:
-    """Gets all posts."""
-    return await get_posts(session=session)
+    """Gets all posts, a page of posts if a limit is given, or streams them as NDJSON."""
+    if after is not None and limit is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'after' can only be used together with 'limit'.",
+        )
+    etag = make_etag(get_version(Post))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if stream:
+        streaming_response = ndjson_response(stream_posts(), PostOutputSchema)
+        set_validators(streaming_response, etag)
+        return streaming_response
+    if limit is None and get_settings().FAST_JSON_RESPONSES:
+        rows_response = json_rows_response(await get_post_rows(session), post_rows_adapter)
+        set_validators(rows_response, etag)
+        return rows_response
+
+    set_validators(response, etag)
+    if limit is None:
+        return await get_posts(session=session)
+
+    page = await get_posts_page(session=session, limit=limit, after=after)
+    set_next_cursor(response, page, limit)
+    return page
 
 
 @router.get(
@@ -68,6 +208,7 @@ async def get_all(
     description="This endpoint requires a post ID; it returns the post with that ID.",
     responses={
         200: {"description": "Post with given ID retrieved."},
+        304: {"description": "Not modified since the given ETag or time."},
         404: {"description": "Post not found."},
         406: {"description": "Too many models found."},
         500: {"description": "Connection to the database failed."},
@@ -75,6 +216,8 @@ async def get_all(
     response_model=PostOutputSchema,
 )
 async def get_by_id(
+        request: Request,
+        response: Response,
         post_id: int = Path(
             ...,
             gt=0,
@@ -83,13 +226,23 @@ async def get_by_id(
         session: AsyncSession = Depends(get_database),
 ) -> PostOutputSchema:
     """Get a post by its ID."""
-    return await get_post(post_id, session)
+    etag = make_etag(get_version(Post))
+    # The resource may not exist, which is only known after the lookup.
+    if is_not_modified(request, etag, exists=False):
+        return not_modified_response(etag)
+
+    post = await get_post(post_id, session)
+    if is_not_modified(request, etag, post.created_at):
+        return not_modified_response(etag, post.created_at)
+    set_validators(response, etag, post.created_at)
+    return post
 
 
 @router.delete(
     "/{post_id}",
     summary="Delete a post by its ID.",
     description="This endpoint requires a post ID; it deletes the post with that ID.",
+    status_code=status.HTTP_204_NO_CONTENT,
     responses={
         204: {"description": "Post with the given ID was deleted."},
         404: {"description": "Post not found."},
@@ -107,6 +260,6 @@ async def delete_post_by_id(
     username: str = Depends(decode_token),
 ) -> None:
     """Delete a post by its ID."""
-    await delete_post(post_id, session)
+    deleted_post = await delete_post(post_id, session)
 
-    await broadcast_list(session)
+    await broadcast_post_deleted(deleted_post)
@@ -1,15 +1,862 @@
+"""Broadcasting of post and user changes to the connected websockets.
+
+Connections use one of two protocol modes:
+
+- list: every change sends the full, latest list of posts (the frontend format).
+- delta: the client receives one snapshot when it connects, followed by small events:
+
+    {"type": "snapshot", "epoch": "...", "seq": 3, "topics": ["posts"], "posts": [...]}
+    {"type": "post_created", "seq": 4, "post": {...}}
+    {"type": "post_deleted", "seq": 5, "id": "1"}
+    {"type": "posts_created", "seq": 6, "posts": [...]}
+    {"type": "posts_deleted", "seq": 7, "ids": ["2", "3"]}
+    {"type": "user_created", "seq": 8, "user": {...}}
+    {"type": "user_deleted", "seq": 9, "id": "1"}
+    {"type": "users_created", "seq": 10, "users": [...]}
+    {"type": "users_deleted", "seq": 11, "ids": ["2", "3"]}
+
+  Sequence numbers increase with every event of the process and a snapshot carries the
+  number of the last event it includes. Events numbered after a snapshot may already be
+  part of it, so clients apply them idempotently. A client sends {"type": "resync"} to
+  get a new snapshot; the server asks for this with {"type": "resync_required"} when it
+  had to discard events for a slow client.
+
+Clients subscribe to topics with {"type": "subscribe", "topic": ...} and
+{"type": "unsubscribe", "topic": ...}. Every connection starts subscribed to the topics
+passed as topic query parameters, or to posts.
+
+- posts: all posts.
+- posts:user:{id}: the posts of one user.
+- users: all users, without their passwords. Delta mode only.
+
+Clients can also send {"type": "ping"}, answered with {"type": "pong"}, and
+{"type": "get_snapshot"}; see handle_message. Every connection may send
+WEBSOCKET_RATE_LIMIT messages per second on average, with bursts of WEBSOCKET_RATE_BURST.
+
+The posts and users are kept in shared in-memory snapshots that are loaded once and then
+kept current by the change events, so snapshots and list refreshes do not query the
+database and a connection holds no database session.
+
+The last WEBSOCKET_REPLAY_SIZE events are kept in a replay buffer. A client that
+reconnects sends {"type": "resume", "epoch": ..., "last_seq": ...} with the epoch of its
+last snapshot and the last sequence number it applied, or passes them as query
+parameters when connecting, and receives only the events it missed:
+
+    {"type": "post_created", "seq": 12, "post": {...}}
+    {"type": "resumed", "epoch": "...", "seq": 12}
+
+Sequence numbers are assigned per process, so when the client reconnects to another
+process, or the missed events were evicted, it receives a snapshot instead.
+
+Changes are routed through an index from topic to connections, so a change only
+reaches the connections subscribed to one of its topics, and a connection only receives
+the part of a batch that matches its topics. After a subscription change the connection
+receives a new snapshot, or in list mode the new list. Frames are serialized once per
+distinct set of subscriptions.
+
+Frames are compact JSON text by default. Clients may choose MessagePack binary frames
+with the encoding query parameter, and a columnar layout for lists of posts and users with
+columnar=true, e.g. {"id": ["1", "2"], "name": ["a", "b"], ...}. Frames are encoded once
+per distinct set of subscriptions and format. Messages from clients are always JSON text.
+
+Changes are published on the broadcast backplane, so they reach the websockets held by
+every worker process; each process numbers the events for its own connections. List
+refreshes are coalesced: a burst of changes results in one list frame with the latest
+state, sent at most BROADCAST_COALESCE_MAX_DELAY seconds after the first change.
+"""
+
+import asyncio
 import json
+import logging
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Iterable, NamedTuple, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import WebSocket
-from src.core.schemas import PostOutputSchema
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+
+from src.core.backplane import RESYNC_EVENT, get_backplane
+from src.core.coalescing import Coalescer
+from src.core.config import get_settings
+from src.core.encoding import Encoding, is_available, to_columns
+from src.core.metrics import CallbackMetric, Counter, Histogram, registry
+from src.core.rate_limit import TokenBucket
+from src.core.snapshot import LiveSnapshot
+from src.core.models import Post, User
+from src.core.schemas import PostOutputSchema, UserPublicSchema
+from src.core.token_cache import verified_tokens
+from src.routers.posts.connections import RESYNC_REQUIRED, Connection, ProtocolMode
+from src.database.crud import cache
+from src.database.database import AsyncSessionLocal
 from src.routers.posts.controller import get_posts
+from src.routers.users.controller import get_users
+
+logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
+
+TOPIC_POSTS = "posts"
+TOPIC_USERS = "users"
+USER_POSTS_TOPIC_PREFIX = "posts:user:"
+
+websocket_connections: set[Connection] = set()
+
+# The connections subscribed to each topic.
+subscriptions: defaultdict[str, set[Connection]] = defaultdict(set)
+
+backplane = get_backplane(get_settings())
+
+posts_adapter = TypeAdapter(list[PostOutputSchema])
+users_adapter = TypeAdapter(list[UserPublicSchema])
+
+# The fields of the delta frames, by event type, built from the changed items.
+_EVENT_FIELDS = {
+    "post_created": lambda items: {"post": items[0]},
+    "post_deleted": lambda items: {"id": items[0]["id"]},
+    "posts_created": lambda items: {"posts": items},
+    "posts_deleted": lambda items: {"ids": [item["id"] for item in items]},
+    "user_created": lambda items: {"user": items[0]},
+    "user_deleted": lambda items: {"id": items[0]["id"]},
+    "users_created": lambda items: {"users": items},
+    "users_deleted": lambda items: {"ids": [item["id"] for item in items]},
+}
+
+# The sequence number of the last delta event. Snapshots are read and events applied to
+# them while holding the lock, so a snapshot always matches its sequence number.
+_sequence = 0
+_sequence_lock = asyncio.Lock()
+
+# Identifies this process, and so the sequence numbers it assigned, for resuming clients.
+EPOCH = uuid.uuid4().hex
+
+# The latest events, for clients that resume after a reconnect.
+replay_buffer: deque = deque(maxlen=get_settings().WEBSOCKET_REPLAY_SIZE)
+_resumed = 0
+_resume_fallbacks = 0
+
+# The owners of the posts changed since the last list refresh; all lists are refreshed
+# when a change did not say which posts it touched.
+_changed_user_ids: set[int] = set()
+_changed_all = False
+
+# Frames dropped for connections that are closed by now; see Connection.dropped.
+_dropped_frames = 0
+
+websocket_broadcast_duration = registry.register(
+    Histogram(
+        "websocket_broadcast_duration_seconds",
+        "Time to serialize a change and enqueue it on the websockets, by kind.",
+        ("kind",),
+    )
+)
+websocket_broadcast_recipients = registry.register(
+    Counter(
+        "websocket_broadcast_recipients_total",
+        "Frames enqueued on websockets by broadcasts, by kind.",
+        ("kind",),
+    )
+)
+
+
+def user_posts_topic(user_id: int) -> str:
+    """Returns the topic of the posts of a user."""
+    return f"{USER_POSTS_TOPIC_PREFIX}{user_id}"
+
+
+def parse_topic(topic: Any) -> str:
+    """Validates a topic sent by a client.
+
+    Args:
+        topic: The topic.
+
+    Returns:
+        The topic in its canonical form.
+
+    Raises:
+        ValueError: If the topic is unknown.
+
+    """
+    if topic in (TOPIC_POSTS, TOPIC_USERS):
+        return topic
+    if isinstance(topic, str) and topic.startswith(USER_POSTS_TOPIC_PREFIX):
+        user_id = topic[len(USER_POSTS_TOPIC_PREFIX):]
+        if user_id.isdecimal() and int(user_id) > 0:
+            return user_posts_topic(int(user_id))
+    raise ValueError(f"Unknown topic: {topic}.")
+
+
+def subscribe(connection: Connection, topic: Any) -> str:
+    """Subscribes a connection to a topic.
+
+    Args:
+        connection: The connection.
+        topic: The topic, as sent by the client.
+
+    Returns:
+        The topic in its canonical form.
+
+    Raises:
+        ValueError: If the topic is unknown, requires delta mode, or the connection is
+            subscribed to too many topics.
+
+    """
+    topic = parse_topic(topic)
+    if topic == TOPIC_USERS and connection.mode != "delta":
+        raise ValueError(f"The {TOPIC_USERS} topic requires delta mode.")
+    if (
+        topic not in connection.topics
+        and len(connection.topics) >= get_settings().WEBSOCKET_MAX_TOPICS
+    ):
+        raise ValueError("Too many topics.")
+
+    connection.topics.add(topic)
+    subscriptions[topic].add(connection)
+    return topic
+
+
+def unsubscribe(connection: Connection, topic: Any) -> str:
+    """Unsubscribes a connection from a topic.
+
+    Args:
+        connection: The connection.
+        topic: The topic, as sent by the client.
+
+    Returns:
+        The topic in its canonical form.
+
+    Raises:
+        ValueError: If the topic is unknown.
+
+    """
+    topic = parse_topic(topic)
+    connection.topics.discard(topic)
+    subscribers = subscriptions.get(topic)
+    if subscribers is not None:
+        subscribers.discard(connection)
+        if not subscribers:
+            del subscriptions[topic]
+    return topic
+
+
+def open_connection(
+    websocket: WebSocket,
+    mode: ProtocolMode = "list",
+    topics: Optional[Iterable[str]] = None,
+    encoding: Encoding = "json",
+    columnar: bool = False,
+) -> Connection:
+    """Registers an accepted websocket and starts its writer task.
+
+    Args:
+        websocket: The accepted websocket.
+        mode: The protocol mode of the connection.
+        topics: The topics to subscribe to, all posts if None.
+        encoding: The encoding of the frames.
+        columnar: Whether lists of posts and users are sent in the columnar layout.
+
+    Returns:
+        The registered connection.
+
+    Raises:
+        ValueError: If the encoding is not available or one of the topics cannot be
+            subscribed to.
+
+    """
+    if not is_available(encoding):
+        raise ValueError(f"The {encoding} encoding is not available.")
+
+    settings = get_settings()
+    connection = Connection(
+        websocket,
+        max_size=settings.WEBSOCKET_QUEUE_SIZE,
+        policy=settings.WEBSOCKET_OVERFLOW_POLICY,
+        send_timeout=settings.WEBSOCKET_SEND_TIMEOUT,
+        mode=mode,
+        limiter=TokenBucket(settings.WEBSOCKET_RATE_LIMIT, settings.WEBSOCKET_RATE_BURST),
+        encoding=encoding,
+        columnar=columnar,
+    )
+    try:
+        for topic in [TOPIC_POSTS] if topics is None else topics:
+            subscribe(connection, topic)
+    except ValueError:
+        _unregister(connection)
+        raise
+
+    connection.start()
+    websocket_connections.add(connection)
+    return connection
+
+
+def _unregister(connection: Connection) -> None:
+    """Removes a connection from the registry and the topic index."""
+    global _dropped_frames  # pylint: disable=global-statement
+
+    if connection in websocket_connections:
+        websocket_connections.remove(connection)
+        _dropped_frames += connection.dropped
+    for topic in list(connection.topics):
+        unsubscribe(connection, topic)
+
+
+async def close_connection(connection: Connection) -> None:
+    """Unregisters a connection and closes it.
+
+    Args:
+        connection: The connection to close.
+
+    """
+    _unregister(connection)
+    await connection.close()
+
+
+def _send(connection: Connection, payload: str | bytes) -> bool:
+    """Enqueues a frame, unregistering the connection if it was closed."""
+    if connection.send(payload):
+        return True
+    _unregister(connection)
+    return False
+
+
+def _post_filter(connection: Connection) -> Optional[frozenset[int]]:
+    """Returns the users whose posts a connection receives, None for all posts."""
+    if TOPIC_POSTS in connection.topics:
+        return None
+    return frozenset(
+        int(topic[len(USER_POSTS_TOPIC_PREFIX):])
+        for topic in connection.topics
+        if topic.startswith(USER_POSTS_TOPIC_PREFIX)
+    )
+
+
+def _post_subscribers(user_ids: Iterable[int]) -> set[Connection]:
+    """Returns the connections subscribed to the posts of any of the given users."""
+    connections = set(subscriptions.get(TOPIC_POSTS, ()))
+    for user_id in set(user_ids):
+        connections.update(subscriptions.get(user_posts_topic(user_id), ()))
+    return connections
+
+
+def _serialize_posts(posts: list[PostOutputSchema]) -> list[dict]:
+    """Serializes validated posts to JSON compatible dicts."""
+    return posts_adapter.dump_python(posts, mode="json")
+
+
+async def _load_posts() -> list[dict]:
+    """Loads all posts for the posts snapshot."""
+    async with AsyncSessionLocal() as session:
+        posts = await get_posts(session)
+    return _serialize_posts(posts_adapter.validate_python(posts, from_attributes=True))
+
+
+async def _load_users() -> list[dict]:
+    """Loads all users, without their passwords, for the users snapshot."""
+    async with AsyncSessionLocal() as session:
+        users = await get_users(session)
+    return users_adapter.dump_python(
+        users_adapter.validate_python(users, from_attributes=True), mode="json"
+    )
+
+
+# The latest posts and users, shared by all connections of this process. They are only
+# read and changed while holding the sequence lock.
+posts_snapshot = LiveSnapshot(_load_posts)
+users_snapshot = LiveSnapshot(_load_users)
+
+
+def _filter_posts(posts: list[dict], user_ids: Optional[frozenset[int]]) -> list[dict]:
+    """Returns the posts of the given users, all posts if user_ids is None."""
+    if user_ids is None:
+        return posts
+    return [post for post in posts if post["user_id"] in user_ids]
+
+
+def _layout(rows: list[dict], connection: Connection) -> list[dict] | dict[str, list]:
+    """Returns rows in the layout of a connection."""
+    return to_columns(rows) if connection.columnar else rows
+
+
+async def send_snapshot(connection: Connection) -> None:
+    """Sends the current state of the subscribed topics to a connection.
+
+    Delta connections receive a snapshot frame, list connections the list of posts. The
+    state is read from the in-memory snapshots, not from the database.
+
+    Args:
+        connection: The connection to send the snapshot to.
+
+    """
+    async with _sequence_lock:
+        posts = _filter_posts(await posts_snapshot.rows(), _post_filter(connection))
+
+        if connection.mode == "list":
+            _send(connection, connection.encode(_layout(posts, connection)))
+            return
+
+        frame = {
+            "type": "snapshot",
+            "epoch": EPOCH,
+            "seq": _sequence,
+            "topics": sorted(connection.topics),
+            "posts": _layout(posts, connection),
+        }
+        if TOPIC_USERS in connection.topics:
+            frame["users"] = _layout(await users_snapshot.rows(), connection)
+        _send(connection, connection.encode(frame))
+
+
+class ReplayEvent(NamedTuple):
+    """A numbered event in the replay buffer.
 
-websocket_connections: set[WebSocket] = set()
+    Attributes:
+        seq: The sequence number.
+        event_type: The type of the delta frame.
+        items: The changed posts or users.
+        payloads: The encoded frames by post filter and frame format, None where no item
+            matches.
+    """
 
+    seq: int
+    event_type: str
+    items: list[dict]
+    payloads: dict[tuple, Optional[str | bytes]]
 
-async def broadcast_list(session: AsyncSession):
+
+def _event_payload(event: ReplayEvent, connection: Connection) -> Optional[str | bytes]:
+    """Returns the frame of an event for a connection, None if none of it matches.
+
+    Frames are encoded once per distinct set of subscriptions and frame format and kept
+    with the event, so live fan-out and replays to many resuming clients share them.
+    """
+    if event.event_type.startswith("user"):
+        if TOPIC_USERS not in connection.topics:
+            return None
+        user_ids = None
+    else:
+        user_ids = _post_filter(connection)
+
+    key = (user_ids, connection.frame_format)
+    if key not in event.payloads:
+        items = _filter_posts(event.items, user_ids)
+        if items:
+            fields = _EVENT_FIELDS[event.event_type](items)
+            for name in fields.keys() & {"posts", "users"}:
+                fields[name] = _layout(fields[name], connection)
+            frame = {"type": event.event_type, "seq": event.seq, **fields}
+            event.payloads[key] = connection.encode(frame)
+        else:
+            event.payloads[key] = None
+    return event.payloads[key]
+
+
+async def _broadcast_event(event_type: str, items: list[dict]) -> None:
+    """Applies an event to its snapshot, numbers it, keeps it for replays and enqueues it
+    on the delta connections subscribed to it.
+
+    Every connection receives the items that match its topics.
+    """
+    global _sequence  # pylint: disable=global-statement
+
+    async with _sequence_lock:
+        started = time.perf_counter()
+        if event_type.startswith("user"):
+            snapshot = users_snapshot
+            connections = set(subscriptions.get(TOPIC_USERS, ()))
+        else:
+            snapshot = posts_snapshot
+            connections = _post_subscribers(item["user_id"] for item in items)
+        if event_type.endswith("_deleted"):
+            snapshot.remove(item["id"] for item in items)
+        else:
+            snapshot.upsert(items)
+
+        _sequence += 1
+        event = ReplayEvent(_sequence, event_type, items, {})
+        replay_buffer.append(event)
+
+        count = 0
+        for connection in connections:
+            if connection.mode != "delta":
+                continue
+            payload = _event_payload(event, connection)
+            if payload is not None:
+                count += _send(connection, payload)
+        websocket_broadcast_duration.observe(time.perf_counter() - started, "event")
+        websocket_broadcast_recipients.inc("event", amount=count)
+        logger.debug(f"Broadcasted event {_sequence} to {count} websockets.")
+
+
+async def resume(connection: Connection, epoch: Any, last_seq: Any) -> bool:
+    """Sends a delta connection the events it missed since last_seq.
+
+    The events are replayed from the replay buffer and followed by
+    {"type": "resumed", "epoch": ..., "seq": ...}. Sequence numbers are only meaningful
+    within the process that assigned them, so when the epoch is not the one of this
+    process, or events after last_seq were already evicted, a snapshot is sent instead.
+    List connections always receive the current list.
+
+    Args:
+        connection: The connection to resume.
+        epoch: The epoch of the last snapshot the client received.
+        last_seq: The sequence number of the last event the client applied.
+
+    Returns:
+        Whether the events could be replayed.
+
+    """
+    global _resumed, _resume_fallbacks  # pylint: disable=global-statement
+
+    if connection.mode == "delta" and epoch == EPOCH and type(last_seq) is int:
+        async with _sequence_lock:
+            if _sequence - len(replay_buffer) <= last_seq <= _sequence:
+                for event in replay_buffer:
+                    if event.seq <= last_seq:
+                        continue
+                    payload = _event_payload(event, connection)
+                    if payload is not None:
+                        _send(connection, payload)
+                _send(
+                    connection,
+                    connection.encode({"type": "resumed", "epoch": EPOCH, "seq": _sequence}),
+                )
+                _resumed += 1
+                return True
+
+    _resume_fallbacks += 1
+    await send_snapshot(connection)
+    return False
+
+
+async def _refresh_lists() -> None:
+    """Sends the latest list of posts to the list connections of this process whose
+    topics match a change since the last refresh.
+
+    The list is serialized once per distinct set of subscriptions and put on the
+    outbound queue of every connection, so the caller never waits on a websocket.
+    """
+    global _changed_all, _changed_user_ids  # pylint: disable=global-statement
+
+    changed_all, changed_user_ids = _changed_all, _changed_user_ids
+    _changed_all, _changed_user_ids = False, set()
+
+    connections = []
+    for connection in websocket_connections:
+        if connection.mode != "list":
+            continue
+        user_ids = _post_filter(connection)
+        if user_ids is None or changed_all or user_ids & changed_user_ids:
+            connections.append(connection)
+    if not connections:
+        return
+
+    async with _sequence_lock:
+        posts = await posts_snapshot.rows()
+
+    started = time.perf_counter()
+    payloads: dict[tuple, str | bytes] = {}
+    count = 0
+    for connection in connections:
+        user_ids = _post_filter(connection)
+        key = (user_ids, connection.frame_format)
+        if key not in payloads:
+            payloads[key] = connection.encode(
+                _layout(_filter_posts(posts, user_ids), connection)
+            )
+        count += _send(connection, payloads[key])
+    websocket_broadcast_duration.observe(time.perf_counter() - started, "list")
+    websocket_broadcast_recipients.inc("list", amount=count)
+    logger.debug(f"Broadcasted {len(posts)} posts to {count} websockets.")
+
+
+list_refresher = Coalescer(
+    _refresh_lists,
+    window=get_settings().BROADCAST_COALESCE_WINDOW,
+    max_delay=get_settings().BROADCAST_COALESCE_MAX_DELAY,
+)
+
+
+async def _deliver(message: dict[str, Any]) -> None:
+    """Fans a backplane message out to the websockets of this process.
+
+    The message may come from another process, so the cached copies of the changed rows
+    and the verified tokens of deleted users are invalidated as well. A resync event,
+    delivered after the backplane lost messages, invalidates everything instead.
+    """
+    event = message["event"]
+    if event == RESYNC_EVENT:
+        await _resync()
+        return
+    if event in ("user_deleted", "users_deleted"):
+        for item in message["items"]:
+            verified_tokens.invalidate_user(int(item["id"]))
+    ids = [int(item["id"]) for item in message["items"]]
+    if event.startswith("user"):
+        cache.invalidate_rows(User.__tablename__, ids)
+        await _broadcast_event(event, message["items"])
+        return
+
+    cache.invalidate_rows(Post.__tablename__, ids)
+    _changed_user_ids.update(item["user_id"] for item in message["items"])
+    await _broadcast_event(event, message["items"])
+    list_refresher.trigger()
+
+
+async def _resync() -> None:
+    """Drops everything derived from changes this process may have missed.
+
+    The caches and snapshots are reloaded from the database, delta clients are told to
+    request a new snapshot, resuming clients receive one and all lists are refreshed.
+    """
+    global _changed_all, _sequence  # pylint: disable=global-statement
+
+    cache.invalidate(Post.__tablename__)
+    cache.invalidate(User.__tablename__)
+    verified_tokens.clear()
+    async with _sequence_lock:
+        posts_snapshot.invalidate()
+        users_snapshot.invalidate()
+        # The buffered events do not cover the missed changes, so no client may resume
+        # from a sequence number assigned before now.
+        replay_buffer.clear()
+        _sequence += 1
+    for connection in list(websocket_connections):
+        if connection.mode == "delta":
+            _send(connection, connection.encode(RESYNC_REQUIRED))
+    _changed_all = True
+    list_refresher.trigger()
+
+
+def _reject(connection: Connection, detail: str) -> None:
+    """Tells a delta client that its message was rejected.
+
+    List clients only ever receive lists of posts, so their messages are dropped silently.
+    """
+    logger.debug(f"Rejected websocket message: {detail}")
+    if connection.mode == "delta":
+        _send(connection, connection.encode({"type": "error", "detail": detail}))
+
+
+async def handle_message(connection: Connection, data: str) -> None:
+    """Handles a message sent by a client.
+
+    The messages are JSON objects with a type:
+
+    - {"type": "ping"}: answered with {"type": "pong"}.
+    - {"type": "get_snapshot"} or {"type": "resync"}: sends a new snapshot.
+    - {"type": "resume", "epoch": ..., "last_seq": ...}: replays the missed events, see
+      resume.
+    - {"type": "subscribe", "topic": ...}: subscribes to a topic and sends a new snapshot.
+    - {"type": "unsubscribe", "topic": ...}: unsubscribes from a topic and sends a new
+      snapshot.
+
+    List clients that send anything else receive the current list, as they did before the
+    commands were introduced; delta clients receive an error. Messages beyond the rate
+    limit of the connection are rejected. No message reads the database, the snapshots
+    are served from memory.
+
+    Args:
+        connection: The connection the message was received on.
+        data: The message.
+
+    """
+    if connection.limiter is not None and not connection.limiter.allow():
+        _reject(connection, "Rate limit exceeded.")
+        return
+
+    try:
+        message = json.loads(data)
+    except ValueError:
+        message = None
+    command = message.get("type") if isinstance(message, dict) else None
+
+    if command == "ping":
+        _send(connection, connection.encode({"type": "pong"}))
+    elif command in ("get_snapshot", "resync"):
+        await send_snapshot(connection)
+    elif command == "resume":
+        await resume(connection, message.get("epoch"), message.get("last_seq"))
+    elif command in ("subscribe", "unsubscribe"):
+        update = subscribe if command == "subscribe" else unsubscribe
+        try:
+            update(connection, message.get("topic"))
+        except ValueError as error:
+            _reject(connection, str(error))
+            return
+        await send_snapshot(connection)
+    elif connection.mode == "list":
+        await send_snapshot(connection)
+    elif command is None:
+        _reject(connection, "Messages must be JSON objects with a type.")
+    else:
+        _reject(connection, f"Unknown command: {command}.")
+
+
+async def start_broadcasting() -> None:
+    """Subscribes this process to the broadcast backplane."""
+    await backplane.start(_deliver)
+
+
+async def stop_broadcasting() -> None:
+    """Unsubscribes this process from the broadcast backplane."""
+    await backplane.stop()
+    list_refresher.cancel()
+
+
+def get_broadcast_stats() -> dict[str, int]:
+    """Returns how many list refreshes were requested, sent and merged, and how many
+    resumes were served from the replay buffer or fell back to a snapshot."""
+    return {
+        **list_refresher.stats(),
+        "resumed": _resumed,
+        "resume_fallbacks": _resume_fallbacks,
+    }
+
+
+def _deleted_posts(posts: Iterable[Post | Row]) -> list[dict]:
+    """Returns the id and owner of deleted posts, the owner is needed for routing."""
+    return [{"id": str(post.id), "user_id": post.user_id} for post in posts]
+
+
+async def broadcast_post_created(post: Post) -> None:
+    """Notifies the websockets of all processes that a post was created.
+
+    Args:
+        post: The created post.
+
+    """
+    await backplane.publish(
+        {
+            "event": "post_created",
+            "items": [PostOutputSchema.model_validate(post).model_dump(mode="json")],
+        }
+    )
+
+
+async def broadcast_post_deleted(post: Post) -> None:
+    """Notifies the websockets of all processes that a post was deleted.
+
+    Args:
+        post: The deleted post.
+
+    """
+    await backplane.publish({"event": "post_deleted", "items": _deleted_posts([post])})
+
+
+async def broadcast_posts_created(posts: list[Post]) -> None:
+    """Notifies the websockets of all processes that a batch of posts was created.
+
+    Args:
+        posts: The created posts.
+
+    """
+    await backplane.publish(
+        {
+            "event": "posts_created",
+            "items": _serialize_posts(posts_adapter.validate_python(posts, from_attributes=True)),
+        }
+    )
+
+
+async def broadcast_posts_deleted(posts: Iterable[Post | Row]) -> None:
+    """Notifies the websockets of all processes that a batch of posts was deleted.
+
+    Args:
+        posts: The deleted posts.
+
+    """
+    await backplane.publish({"event": "posts_deleted", "items": _deleted_posts(posts)})
+
+
+async def broadcast_user_created(user: User) -> None:
+    """Notifies the websockets of all processes that a user was created.
+
+    Args:
+        user: The created user.
+
+    """
+    await backplane.publish(
+        {
+            "event": "user_created",
+            "items": [UserPublicSchema.model_validate(user).model_dump(mode="json")],
+        }
+    )
+
+
+async def broadcast_user_deleted(user_id: int) -> None:
+    """Notifies the websockets of all processes that a user was deleted.
+
+    Args:
+        user_id: The id of the deleted user.
+
+    """
+    await backplane.publish({"event": "user_deleted", "items": [{"id": str(user_id)}]})
+
+
+async def broadcast_users_created(users: list[User]) -> None:
+    """Notifies the websockets of all processes that a batch of users was created.
+
+    Args:
+        users: The created users.
+
+    """
+    await backplane.publish(
+        {
+            "event": "users_created",
+            "items": users_adapter.dump_python(
+                users_adapter.validate_python(users, from_attributes=True), mode="json"
+            ),
+        }
+    )
+
+
+async def broadcast_users_deleted(user_ids: Iterable[int]) -> None:
+    """Notifies the websockets of all processes that a batch of users was deleted.
+
+    Args:
+        user_ids: The ids of the deleted users.
+
+    """
+    await backplane.publish(
+        {"event": "users_deleted", "items": [{"id": str(user_id)} for user_id in user_ids]}
+    )
+
+
+def _connection_counts() -> dict[tuple[str, ...], float]:
+    """Returns the number of open websockets by protocol mode."""
+    counts = {("list",): 0, ("delta",): 0}
     for connection in websocket_connections:
-        pass
+        counts[(connection.mode,)] += 1
+    return counts
+
+
+def _dropped_frame_count() -> dict[tuple[str, ...], float]:
+    """Returns the frames dropped by the overflow policy, of open and closed websockets."""
+    dropped = sum(connection.dropped for connection in websocket_connections)
+    return {(): _dropped_frames + dropped}
+
 
-        # Only one (probably) broke part of the app, that you should work on.
+registry.register(
+    CallbackMetric(
+        "websocket_connections",
+        "Open websockets by protocol mode.",
+        _connection_counts,
+        ("mode",),
+    )
+)
+registry.register(
+    CallbackMetric(
+        "websocket_frames_dropped_total",
+        "Frames discarded because a websocket's queue was full.",
+        _dropped_frame_count,
+        type_name="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "websocket_broadcast_events_total",
+        "List refreshes requested, sent and merged, and resumes served or fallen back.",
+        lambda: {(name,): value for name, value in get_broadcast_stats().items()},
+        ("event",),
+        type_name="counter",
+    )
+)
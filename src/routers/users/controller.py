@@ -1,17 +1,30 @@
 import logging
+from typing import AsyncIterator
 
-from fastapi import HTTPException, status
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import get_settings
 from src.core.models import User
-from src.core.schemas import UserInputSchema
-from src.database.crud import create, get, delete
+from src.core.schemas import UserInputSchema, UserOutputSchema
+from src.core.token_cache import verified_tokens
+from src.database.crud import (
+    create,
+    create_many,
+    get,
+    get_by,
+    get_rows,
+    get_page,
+    delete,
+    delete_many,
+    stream,
+)
+from src.database.database import AsyncSessionLocal
 
 logger = logging.getLogger(get_settings().LOGGER_CONTROLLERS_NAME)
 
 
-async def create_user(user_input: UserInputSchema, session: AsyncSession) -> User:
+async def create_user(user_input: UserInputSchema, session: AsyncSession) -> Row:
     """Creates a user."""
     logger.debug("Creating user.")
     new_user = await create(
@@ -22,6 +35,18 @@ async def create_user(user_input: UserInputSchema, session: AsyncSession) -> Use
     return new_user
 
 
+async def create_users(user_inputs: list[UserInputSchema], session: AsyncSession) -> list[User]:
+    """Creates users in a single transaction."""
+    logger.debug(f"Creating {len(user_inputs)} users.")
+    new_users = await create_many(
+        User,
+        session,
+        [user_input.model_dump() for user_input in user_inputs],
+    )
+    await session.commit()
+    return new_users
+
+
 async def get_users(session: AsyncSession) -> list[User]:
     """Returns a list of all users."""
     logger.debug("Getting all users.")
@@ -34,40 +59,60 @@ async def get_users(session: AsyncSession) -> list[User]:
     return users
 
 
+async def get_user_rows(session: AsyncSession) -> list[dict]:
+    """Returns all users as dicts in the shape of UserOutputSchema."""
+    logger.debug("Getting the rows of all users.")
+    return await get_rows(User, session, [], UserOutputSchema.model_fields)
+
+
+async def get_users_page(session: AsyncSession, limit: int, after: int | None) -> list[User]:
+    """Returns a page of users ordered by ID."""
+    logger.debug(f"Getting {limit} users after {after}.")
+    return await get_page(User, session, [], limit=limit, after=after)
+
+
+async def stream_users() -> AsyncIterator[list[User]]:
+    """Yields all users in chunks ordered by ID.
+
+    Uses a session of its own, because the request session is closed before a streaming
+    response is sent.
+    """
+    async with AsyncSessionLocal() as session:
+        async for chunk in stream(User, session, [], get_settings().STREAM_CHUNK_SIZE):
+            yield chunk
+
+
 async def get_user_by_id(user_id: int, session: AsyncSession) -> User:
     """Returns a user selected by its ID."""
     logger.info(f"Getting user for {user_id}.")
 
-    result = await get(
-        User,
-        session,
-        [User.id == user_id],
-        expected_count=1,
-    )
-
-    return result[0]
+    return await get_by(User, session, User.id, user_id)
 
 
 async def get_user_by_name(name: str, session: AsyncSession) -> User:
     """Returns a user selected by its ID."""
     logger.info(f"Getting user for {name}.")
 
-    result = await get(
-        User,
-        session,
-        [User.name == name],
-        expected_count=1,
-    )
+    return await get_by(User, session, User.name, name)
 
-    return result[0]
 
-
-async def delete_user(user_id: int, session: AsyncSession, ) -> None:
-    """Deletes a  selected by its ID."""
-    await delete(User, session, [User.id == user_id])
+async def delete_user(user_id: int, session: AsyncSession, ) -> Row:
+    """Deletes a user selected by its ID and returns it."""
+    deleted = await delete(User, session, [User.id == user_id])
     await session.commit()
+    verified_tokens.invalidate_user(user_id)
+    return deleted
 
-    raise HTTPException(
-        status_code=status.HTTP_204_NO_CONTENT,
-        detail="The user has been deleted.",
-    )
+
+async def delete_users(user_ids: list[int], session: AsyncSession) -> list[Row]:
+    """Deletes users selected by their IDs in a single transaction.
+
+    Returns:
+        The rows of the users that existed and were deleted.
+
+    """
+    deleted = await delete_many(User, session, user_ids)
+    await session.commit()
+    for row in deleted:
+        verified_tokens.invalidate_user(row.id)
+    return deleted
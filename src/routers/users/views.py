@@ -1,14 +1,51 @@
 """Contains endpoints for interacting with the users table."""
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Body, Path, Depends, status
+from fastapi import APIRouter, Body, Path, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.auth import decode_token
+from src.core.config import get_settings
 from src.core.openapi import Descriptions
-from src.core.schemas import UserOutputSchema, UserInputSchema
+from src.core.models import Post, User
+from src.core.responses import (
+    NEXT_CURSOR_HEADER,
+    is_not_modified,
+    json_rows_response,
+    make_etag,
+    ndjson_response,
+    not_modified_response,
+    set_next_cursor,
+    set_validators,
+)
+from src.core.schemas import (
+    BulkDeleteResultSchema,
+    PostOutputSchema,
+    UserOutputSchema,
+    UserInputSchema,
+    user_rows_adapter,
+)
+from src.database.crud import get_version
 from src.database.database import get_database
-from src.routers.users.controller import create_user, get_users, get_user_by_id, delete_user
+from src.routers.posts.controller import get_user_posts
+from src.routers.posts.websockets import (
+    broadcast_user_created,
+    broadcast_user_deleted,
+    broadcast_users_created,
+    broadcast_users_deleted,
+)
+from src.routers.users.controller import (
+    create_user,
+    create_users,
+    get_users,
+    get_user_rows,
+    get_users_page,
+    get_user_by_id,
+    delete_user,
+    delete_users,
+    stream_users,
+)
 
 router = APIRouter(
     prefix="/users",
@@ -23,6 +60,7 @@ router = APIRouter(
     status_code=status.HTTP_201_CREATED,
     responses={
         201: {"description": "User created."},
+        409: {"description": "User with this name already exists."},
         500: {"description": "Connection to the database failed."},
 
     },
@@ -36,27 +74,135 @@ async def create(
 ) -> UserOutputSchema:
     """Creates a user."""
 
-    return await create_user(user_input=user, session=session)
+    created_user = await create_user(user_input=user, session=session)
+
+    await broadcast_user_created(created_user)
+
+    return created_user
+
+
+@router.post(
+    "/bulk",
+    summary="Create users in bulk.",
+    description=(
+        "Create a batch of users in a single transaction; it returns the created users in "
+        "the order they were given."
+    ),
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        201: {"description": "Users created."},
+        409: {"description": "User with one of these names already exists."},
+        500: {"description": "Connection to the database failed."},
+    },
+    response_model=list[UserOutputSchema,],
+)
+async def create_bulk(
+    users: list[UserInputSchema] = Body(
+        ...,
+        min_length=1,
+        max_length=get_settings().BULK_MAX_ITEMS,
+    ),
+    session: AsyncSession = Depends(get_database),
+) -> list[UserOutputSchema]:
+    """Creates users in bulk."""
+
+    created_users = await create_users(user_inputs=users, session=session)
+
+    await broadcast_users_created(created_users)
+
+    return created_users
+
+
+@router.delete(
+    "/bulk",
+    summary="Delete users in bulk.",
+    description=(
+        "This endpoint requires a list of user IDs; it deletes the users with those IDs in "
+        "a single transaction and returns for every ID whether it was deleted."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Deletion result for every given ID."},
+        500: {"description": "Connection to the database failed."},
+    },
+    response_model=list[BulkDeleteResultSchema,],
+)
+async def delete_bulk(
+    user_ids: list[int] = Body(
+        ...,
+        min_length=1,
+        max_length=get_settings().BULK_MAX_ITEMS,
+        description=Descriptions.user_ids,
+    ),
+    session: AsyncSession = Depends(get_database),
+    username: str = Depends(decode_token),
+) -> list[BulkDeleteResultSchema]:
+    """Deletes users in bulk."""
+    deleted = await delete_users(user_ids, session)
+
+    deleted_ids = {row.id for row in deleted}
+    if deleted_ids:
+        await broadcast_users_deleted(sorted(deleted_ids))
+
+    return [
+        BulkDeleteResultSchema(id=str(user_id), deleted=user_id in deleted_ids)
+        for user_id in user_ids
+    ]
 
 
 @router.get(
     "",
     summary="Get all users.",
-    description="Get all users.",
+    description=(
+        "Get all users. Pass a limit to get a page ordered by ID; the "
+        f"{NEXT_CURSOR_HEADER} header then holds the cursor to pass as 'after' for "
+        "the next page. Pass stream=true to stream all users as newline delimited JSON."
+    ),
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Users retrieved."},
+        304: {"description": "Not modified since the given ETag or time."},
         404: {"description": "Too few models found."},
+        422: {"description": "A cursor was given without a limit."},
         406: {"description": "Too many models found."},
         500: {"description": "Connection to the database failed."},
     },
     response_model=list[UserOutputSchema,],
 )
 async def get_all(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, gt=0, le=1000, description=Descriptions.limit),
+    after: Optional[int] = Query(None, ge=0, description=Descriptions.after),
+    stream: bool = Query(False, description=Descriptions.stream),
     session: AsyncSession = Depends(get_database),
 ) -> list[UserOutputSchema]:
-    """Gets all users."""
-    return await get_users(session=session)
+    """Gets all users, a page of users if a limit is given, or streams them as NDJSON."""
+    if after is not None and limit is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'after' can only be used together with 'limit'.",
+        )
+    etag = make_etag(get_version(User))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if stream:
+        streaming_response = ndjson_response(stream_users(), UserOutputSchema)
+        set_validators(streaming_response, etag)
+        return streaming_response
+    if limit is None and get_settings().FAST_JSON_RESPONSES:
+        rows_response = json_rows_response(await get_user_rows(session), user_rows_adapter)
+        set_validators(rows_response, etag)
+        return rows_response
+
+    set_validators(response, etag)
+    if limit is None:
+        return await get_users(session=session)
+
+    page = await get_users_page(session=session, limit=limit, after=after)
+    set_next_cursor(response, page, limit)
+    return page
 
 
 @router.get(
@@ -65,6 +211,7 @@ async def get_all(
     description="This endpoint requires a user ID; it returns the user with that ID.",
     responses={
         200: {"description": "User with given ID retrieved."},
+        304: {"description": "Not modified since the given ETag or time."},
         404: {"description": "User not found."},
         406: {"description": "Too many models found."},
         500: {"description": "Connection to the database failed."},
@@ -72,6 +219,8 @@ async def get_all(
     response_model=UserOutputSchema,
 )
 async def get_by_id(
+    request: Request,
+    response: Response,
     user_id: int = Path(
         ...,
         gt=0,
@@ -80,13 +229,66 @@ async def get_by_id(
     session: AsyncSession = Depends(get_database),
 ) -> UserOutputSchema:
     """Get a user by its ID."""
-    return await get_user_by_id(user_id, session)
+    etag = make_etag(get_version(User))
+    # The resource may not exist, which is only known after the lookup.
+    if is_not_modified(request, etag, exists=False):
+        return not_modified_response(etag)
+
+    user = await get_user_by_id(user_id, session)
+    if is_not_modified(request, etag, user.created_at):
+        return not_modified_response(etag, user.created_at)
+    set_validators(response, etag, user.created_at)
+    return user
+
+
+@router.get(
+    "/{user_id}/posts",
+    summary="Get the posts of a user.",
+    description=(
+        "This endpoint requires a user ID; it returns a page of the posts of that user "
+        f"ordered by ID. The {NEXT_CURSOR_HEADER} header holds the cursor to pass as "
+        "'after' for the next page. Pass 'since' to only get posts created from that time "
+        "on, e.g. when polling for new posts."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Posts of the user retrieved."},
+        304: {"description": "Not modified since the given ETag or time."},
+        404: {"description": "User not found."},
+        500: {"description": "Connection to the database failed."},
+    },
+    response_model=list[PostOutputSchema,],
+)
+async def get_posts_by_user_id(
+    request: Request,
+    response: Response,
+    user_id: int = Path(
+        ...,
+        gt=0,
+        description=Descriptions.user_id,
+    ),
+    limit: int = Query(100, gt=0, le=1000, description=Descriptions.limit),
+    after: Optional[int] = Query(None, ge=0, description=Descriptions.after),
+    since: Optional[datetime] = Query(None, description=Descriptions.since),
+    session: AsyncSession = Depends(get_database),
+) -> list[PostOutputSchema]:
+    """Get a page of the posts of a user."""
+    etag = make_etag(get_version(Post, User))
+    # The resource may not exist, which is only known after the lookup.
+    if is_not_modified(request, etag, exists=False):
+        return not_modified_response(etag)
+
+    set_validators(response, etag)
+    page = await get_user_posts(user_id, session, limit=limit, after=after, since=since)
+    set_next_cursor(response, page, limit)
+    return page
 
 
 @router.delete(
     "/{user_id}",
     summary="Delete a user by its ID.",
     description="This endpoint requires a user ID; it deletes the user with that ID.",
+    status_code=status.HTTP_204_NO_CONTENT,
     responses={
         204: {"description": "User with the given ID was deleted."},
         404: {"description": "User not found."},
@@ -105,3 +307,5 @@ async def delete_user_by_id(
 ) -> None:
     """Delete a user by its ID."""
     await delete_user(user_id, session)
+
+    await broadcast_user_deleted(user_id)
@@ -0,0 +1,26 @@
+"""Configures the app for the tests, before any module of it is imported."""
+
+import os
+import tempfile
+
+import pytest
+
+_directory = tempfile.mkdtemp(prefix="fastapi-example-tests-")
+
+os.environ["ENVIRONMENT"] = "test"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_directory}/test.db"
+os.environ["LOGGING_REQUESTS_FILE"] = os.path.join(_directory, "requests.log")
+os.environ["LOGGING_CONTROLLERS_FILE"] = os.path.join(_directory, "controllers.log")
+os.environ["BROADCAST_BACKPLANE"] = "memory"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A client of the app, with the app started and the database migrated."""
+    # pylint: disable=import-outside-toplevel
+    from fastapi.testclient import TestClient
+
+    from src.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,74 @@
+"""Tests of the verification of bearer tokens and their cache."""
+
+from jose import jwt
+
+from src.core.auth import ALGORITHM, SECRET_KEY
+from src.core.token_cache import VerifiedTokenCache
+
+USERS = "/api/v1/users"
+
+
+def _create_user(client, name: str) -> tuple[int, dict[str, str]]:
+    """Creates a user and returns its id and the headers authenticating it."""
+    response = client.post(USERS, json={"name": name, "password": "secret"})
+    assert response.status_code == 201
+    token = jwt.encode({"name": name, "password": "secret"}, SECRET_KEY, algorithm=ALGORITHM)
+    return int(response.json()["id"]), {"Authorization": f"Bearer {token}"}
+
+
+def test_token_verified_before_an_invalidation_is_not_cached():
+    tokens = VerifiedTokenCache(max_entries=10, ttl=60)
+    generation = tokens.generation
+    tokens.invalidate_user(1)
+
+    tokens.add("first", 1, "first", generation=generation)
+    tokens.add("second", 2, "second", generation=generation)
+
+    assert tokens.get("first") is None
+    assert tokens.get("second") is not None
+
+
+def test_forgotten_invalidations_still_prevent_caching():
+    tokens = VerifiedTokenCache(max_entries=1, ttl=60)
+    generation = tokens.generation
+    tokens.invalidate_user(1)
+    tokens.invalidate_user(2)
+
+    tokens.add("first", 1, "first", generation=generation)
+
+    assert tokens.get("first") is None
+
+
+def test_user_deleted_while_verifying_its_token_is_not_cached(client, monkeypatch):
+    # pylint: disable=import-outside-toplevel
+    from src.core import auth
+    from src.core.token_cache import verified_tokens
+
+    user_id, headers = _create_user(client, "deleted while verifying")
+    lookup = auth.get_user_by_name
+
+    async def get_user_then_delete(name, session):
+        user = await lookup(name, session)
+        # The user is deleted after it was read, before its token is cached.
+        verified_tokens.invalidate_user(user.id)
+        return user
+
+    monkeypatch.setattr(auth, "get_user_by_name", get_user_then_delete)
+    client.delete(f"{USERS}/{user_id + 1000}", headers=headers)
+
+    assert verified_tokens.get(headers["Authorization"].split()[1]) is None
+
+
+def test_deleted_user_can_no_longer_authenticate(client):
+    user_id, headers = _create_user(client, "deleted")
+    # Verifies the token, which is cached from now on.
+    assert client.delete(f"{USERS}/{user_id + 1000}", headers=headers).status_code == 404
+
+    assert client.delete(f"{USERS}/{user_id}", headers=headers).status_code == 204
+
+    response = client.post(
+        "/api/v1/posts",
+        json={"name": "after deletion", "content": "content", "user_id": user_id},
+        headers=headers,
+    )
+    assert response.status_code == 404
@@ -0,0 +1,93 @@
+"""Tests of the Unix socket backplane, with several instances in one event loop."""
+
+import asyncio
+
+from src.core.backplane import RESYNC_EVENT, UnixSocketBackplane
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    """Waits until a condition holds, failing the test after the timeout."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+async def _start(path: str, count: int) -> tuple[list[UnixSocketBackplane], list[list[dict]]]:
+    """Starts backplanes on one socket, each recording the messages it receives."""
+    backplanes, received = [], []
+    for _ in range(count):
+        messages: list[dict] = []
+
+        async def handler(message: dict, messages: list[dict] = messages) -> None:
+            messages.append(message)
+
+        backplane = UnixSocketBackplane(path, reconnect_delay=0.01)
+        await backplane.start(handler)
+        backplanes.append(backplane)
+        received.append(messages)
+    await _wait_for(lambda: len(backplanes[0]._hub_clients) == count)
+    return backplanes, received
+
+
+def _events(messages: list[dict], event: str) -> list[dict]:
+    return [message for message in messages if message["event"] == event]
+
+
+def test_messages_published_by_any_instance_reach_all_instances(tmp_path):
+    async def scenario():
+        backplanes, received = await _start(str(tmp_path / "hub.sock"), 3)
+
+        for number, backplane in enumerate(backplanes):
+            await backplane.publish({"event": "post_created", "items": [{"id": number}]})
+        await _wait_for(lambda: all(len(messages) == 3 for messages in received))
+
+        for messages in received:
+            assert sorted(message["items"][0]["id"] for message in messages) == [0, 1, 2]
+
+        for backplane in backplanes:
+            await backplane.stop()
+
+    asyncio.run(scenario())
+
+
+def test_another_instance_takes_over_the_hub_and_resyncs(tmp_path):
+    async def scenario():
+        backplanes, received = await _start(str(tmp_path / "hub.sock"), 3)
+        hub, others = backplanes[0], backplanes[1:]
+        assert hub._server is not None
+        assert all(backplane._server is None for backplane in others)
+
+        await hub.stop()
+        await _wait_for(lambda: any(backplane._server is not None for backplane in others))
+        # Every instance that reconnected tells all instances to resync.
+        await _wait_for(
+            lambda: all(len(_events(received[i], RESYNC_EVENT)) >= 2 for i in (1, 2))
+        )
+
+        for number, backplane in enumerate(others):
+            await backplane.publish({"event": "post_created", "items": [{"id": number}]})
+        await _wait_for(
+            lambda: all(len(_events(received[i], "post_created")) == 2 for i in (1, 2))
+        )
+        assert not _events(received[0], "post_created")
+
+        for backplane in others:
+            await backplane.stop()
+
+    asyncio.run(scenario())
+
+
+def test_resync_drops_the_verified_tokens_and_snapshots(client):
+    # pylint: disable=import-outside-toplevel
+    from src.core.token_cache import verified_tokens
+    from src.routers.posts import websockets
+
+    verified_tokens.add("token", 1, "user")
+    sequence = websockets._sequence
+
+    client.portal.call(websockets._deliver, {"event": RESYNC_EVENT, "items": []})
+
+    assert verified_tokens.get("token") is None
+    assert websockets._sequence == sequence + 1
+    assert not websockets.replay_buffer
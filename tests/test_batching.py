@@ -0,0 +1,64 @@
+"""Tests of the group commit of concurrent writes."""
+
+import asyncio
+
+from fastapi import HTTPException
+
+from src.core.models import Post
+from src.database.batching import WriteBatcher
+from src.database.crud import create
+
+POSTS = "/api/v1/posts"
+
+
+def _create_user(client, name: str) -> int:
+    response = client.post("/api/v1/users", json={"name": name, "password": "secret"})
+    assert response.status_code == 201
+    return int(response.json()["id"])
+
+
+def _write_concurrently(client, batcher: WriteBatcher, posts: list[Post]) -> list:
+    """Submits the creation of the posts at once and returns their results or errors."""
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.submit(lambda session, post=post: create(post, session)) for post in posts),
+            return_exceptions=True,
+        )
+
+    return client.portal.call(scenario)
+
+
+def test_concurrent_writes_are_committed_in_one_batch(client):
+    user_id = _create_user(client, "batched")
+    batcher = WriteBatcher(max_batch_size=10, max_latency=0.05)
+    posts = [
+        Post(name=f"batched {number}", content="content", user_id=user_id) for number in range(3)
+    ]
+
+    results = _write_concurrently(client, batcher, posts)
+
+    assert [row.name for row in results] == ["batched 0", "batched 1", "batched 2"]
+    assert batcher.stats() == {"batches": 1, "operations": 3, "fallbacks": 0}
+    for row in results:
+        assert client.get(f"{POSTS}/{row.id}").status_code == 200
+
+
+def test_failing_write_only_fails_its_own_caller(client):
+    user_id = _create_user(client, "batched with a conflict")
+    batcher = WriteBatcher(max_batch_size=10, max_latency=0.05)
+    posts = [
+        Post(name="before the conflict", content="content", user_id=user_id),
+        Post(name="conflict", content="content", user_id=user_id),
+        Post(name="conflict", content="content", user_id=user_id),
+        Post(name="after the conflict", content="content", user_id=user_id),
+    ]
+
+    first, conflict, duplicate_error, last = _write_concurrently(client, batcher, posts)
+
+    assert conflict.name == "conflict"
+    assert isinstance(duplicate_error, HTTPException)
+    assert duplicate_error.status_code == 409
+    assert batcher.stats() == {"batches": 0, "operations": 0, "fallbacks": 1}
+    for row in (first, conflict, last):
+        assert client.get(f"{POSTS}/{row.id}").status_code == 200
@@ -0,0 +1,115 @@
+"""Tests of the bulk create and delete endpoints."""
+
+from jose import jwt
+
+from src.core.auth import ALGORITHM, SECRET_KEY
+
+POSTS = "/api/v1/posts"
+USERS = "/api/v1/users"
+
+
+def _login(client, name: str) -> tuple[int, dict[str, str]]:
+    """Creates a user and returns its id and the headers authenticating it."""
+    response = client.post(USERS, json={"name": name, "password": "secret"})
+    assert response.status_code == 201
+    token = jwt.encode({"name": name, "password": "secret"}, SECRET_KEY, algorithm=ALGORITHM)
+    return int(response.json()["id"]), {"Authorization": f"Bearer {token}"}
+
+
+def _posts(user_id: int, *names: str) -> list[dict]:
+    return [{"name": name, "content": "content", "user_id": user_id} for name in names]
+
+
+def test_bulk_create_and_delete_posts(client):
+    user_id, headers = _login(client, "bulk posts")
+
+    created = client.post(
+        f"{POSTS}/bulk", json=_posts(user_id, "bulk 1", "bulk 2"), headers=headers
+    )
+    assert created.status_code == 201
+    assert [post["name"] for post in created.json()] == ["bulk 1", "bulk 2"]
+
+    ids = [int(post["id"]) for post in created.json()]
+    deleted = client.request("DELETE", f"{POSTS}/bulk", json=[*ids, 999999], headers=headers)
+
+    assert deleted.status_code == 200
+    assert deleted.json() == [
+        {"id": str(ids[0]), "deleted": True},
+        {"id": str(ids[1]), "deleted": True},
+        {"id": "999999", "deleted": False},
+    ]
+    assert all(client.get(f"{POSTS}/{post_id}").status_code == 404 for post_id in ids)
+
+
+def test_bulk_create_with_a_duplicate_name_creates_nothing(client):
+    user_id, headers = _login(client, "bulk conflict")
+    assert client.post(POSTS, json=_posts(user_id, "taken")[0], headers=headers).status_code == 201
+    before = client.get(POSTS).json()
+
+    response = client.post(
+        f"{POSTS}/bulk", json=_posts(user_id, "not taken", "taken"), headers=headers
+    )
+
+    assert response.status_code == 409
+    assert client.get(POSTS).json() == before
+
+
+def test_bulk_create_and_delete_users(client):
+    _, headers = _login(client, "bulk admin")
+    users = [{"name": f"bulk user {number}", "password": "secret"} for number in range(2)]
+
+    created = client.post(f"{USERS}/bulk", json=users)
+    assert created.status_code == 201
+    ids = [int(user["id"]) for user in created.json()]
+
+    deleted = client.request("DELETE", f"{USERS}/bulk", json=ids, headers=headers)
+
+    assert deleted.status_code == 200
+    assert [result["deleted"] for result in deleted.json()] == [True, True]
+    assert all(client.get(f"{USERS}/{user_id}").status_code == 404 for user_id in ids)
+
+
+def test_bulk_users_with_a_duplicate_name_creates_nothing(client):
+    users = [{"name": "bulk twin", "password": "secret"}] * 2
+
+    response = client.post(f"{USERS}/bulk", json=users)
+
+    assert response.status_code == 409
+    assert "bulk twin" not in [user["name"] for user in client.get(USERS).json()]
+
+
+def test_bulk_writes_are_broadcast_as_one_event(client):
+    user_id, headers = _login(client, "bulk events")
+
+    with client.websocket_connect(f"/ws?mode=delta&topic=posts:user:{user_id}") as websocket:
+        websocket.receive_json()
+        created = client.post(
+            f"{POSTS}/bulk", json=_posts(user_id, "event 1", "event 2"), headers=headers
+        ).json()
+        created_event = websocket.receive_json()
+        ids = [int(post["id"]) for post in created]
+        client.request("DELETE", f"{POSTS}/bulk", json=ids, headers=headers)
+        deleted_event = websocket.receive_json()
+
+    assert created_event["type"] == "posts_created"
+    assert [post["name"] for post in created_event["posts"]] == ["event 1", "event 2"]
+    assert deleted_event["type"] == "posts_deleted"
+    assert sorted(int(post_id) for post_id in deleted_event["ids"]) == ids
+
+
+def test_bulk_user_writes_are_broadcast_as_one_event(client):
+    _, headers = _login(client, "bulk user events")
+    users = [{"name": f"event user {number}", "password": "secret"} for number in range(2)]
+
+    with client.websocket_connect("/ws?mode=delta&topic=users") as websocket:
+        websocket.receive_json()
+        created = client.post(f"{USERS}/bulk", json=users).json()
+        created_event = websocket.receive_json()
+        ids = [int(user["id"]) for user in created]
+        client.request("DELETE", f"{USERS}/bulk", json=ids, headers=headers)
+        deleted_event = websocket.receive_json()
+
+    assert created_event["type"] == "users_created"
+    assert [user["name"] for user in created_event["users"]] == ["event user 0", "event user 1"]
+    assert deleted_event["type"] == "users_deleted"
+    assert sorted(int(user_id) for user_id in deleted_event["ids"]) == ids
@@ -0,0 +1,172 @@
+"""Tests of the read-through cache."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.crud import ReadThroughCache
+
+
+def test_followers_load_again_when_the_leader_is_cancelled():
+    async def scenario():
+        cache = ReadThroughCache(max_entries=10, ttl=60)
+        started, release = asyncio.Event(), asyncio.Event()
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            if len(loads) == 1:
+                started.set()
+                await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load(("users", "id", 1), loader))
+        await started.wait()
+        followers = [
+            asyncio.create_task(cache.get_or_load(("users", "id", 1), loader)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results, len(loads)
+
+    results, loads = asyncio.run(scenario())
+
+    assert results == ["value"] * 3
+    assert loads == 2
+
+
+def test_cancelled_follower_does_not_affect_the_others():
+    async def scenario():
+        cache = ReadThroughCache(max_entries=10, ttl=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load(("users", "id", 1), loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load(("users", "id", 1), loader))
+        other = asyncio.create_task(cache.get_or_load(("users", "id", 1), loader))
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader, await other
+
+    assert asyncio.run(scenario()) == ("value", "value")
+
+
+def test_failed_load_is_raised_to_every_caller():
+    async def scenario():
+        cache = ReadThroughCache(max_entries=10, ttl=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            raise LookupError("missing")
+
+        tasks = [
+            asyncio.create_task(cache.get_or_load(("users", "id", 1), loader)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+def _row(id_: int) -> SimpleNamespace:
+    return SimpleNamespace(id=id_)
+
+
+def test_write_only_evicts_the_entries_of_the_written_rows():
+    async def scenario():
+        cache = ReadThroughCache(max_entries=10, ttl=60)
+        loads = []
+
+        async def load(key, value):
+            loads.append(key)
+            return value
+
+        async def lookup(key, value, row_ids=lambda rows: [row.id for row in rows]):
+            return await cache.get_or_load(key, lambda: load(key, value), row_ids)
+
+        first, second = ("posts", "id", 1), ("posts", "id", 2)
+        by_name, listing = ("posts", "name", "first"), ("posts", "all")
+        for key, value in ((first, [_row(1)]), (second, [_row(2)]), (by_name, [_row(1)])):
+            await lookup(key, value)
+        await lookup(listing, [_row(1), _row(2)], row_ids=None)
+        version = cache.version("posts")
+
+        cache.invalidate_rows("posts", [1])
+        loads.clear()
+        for key in (first, second, by_name):
+            await lookup(key, [_row(key[2] if key[1] == "id" else 1)])
+        await lookup(listing, [_row(1), _row(2)], row_ids=None)
+
+        return loads, cache.version("posts") - version
+
+    loads, versions = asyncio.run(scenario())
+
+    assert loads == [("posts", "id", 1), ("posts", "name", "first"), ("posts", "all")]
+    assert versions == 1
+
+
+def test_load_in_flight_during_a_write_is_not_stored():
+    async def scenario():
+        cache = ReadThroughCache(max_entries=10, ttl=60)
+        started, release = asyncio.Event(), asyncio.Event()
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            started.set()
+            await release.wait()
+            return [_row(1)]
+
+        def row_ids(rows):
+            return [row.id for row in rows]
+
+        task = asyncio.create_task(cache.get_or_load(("posts", "id", 1), loader, row_ids))
+        await started.wait()
+        cache.invalidate_rows("posts", [1])
+        release.set()
+        await task
+        await cache.get_or_load(("posts", "id", 1), loader, row_ids)
+        return len(loads)
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_creating_a_post_keeps_the_other_posts_cached(client):
+    # pylint: disable=import-outside-toplevel
+    from jose import jwt
+
+    from src.core.auth import ALGORITHM, SECRET_KEY
+    from src.database.crud import cache
+
+    user = client.post("/api/v1/users", json={"name": "cached", "password": "secret"}).json()
+    token = jwt.encode({"name": "cached", "password": "secret"}, SECRET_KEY, ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def create_post(name: str) -> dict:
+        body = {"name": name, "content": "content", "user_id": int(user["id"])}
+        return client.post("/api/v1/posts", json=body, headers=headers).json()
+
+    post = create_post("cached post")
+    client.get(f"/api/v1/posts/{post['id']}")
+    create_post("another post")
+    hits = cache.hits
+
+    assert client.get(f"/api/v1/posts/{post['id']}").status_code == 200
+    assert cache.hits == hits + 1
@@ -0,0 +1,91 @@
+"""Tests of the conditional GET requests answered with 304 Not Modified."""
+
+from jose import jwt
+
+from src.core.auth import ALGORITHM, SECRET_KEY
+
+POSTS = "/api/v1/posts"
+
+
+def _create_post(client, name: str) -> dict:
+    """Creates a user with a post and returns the post."""
+    user = client.post("/api/v1/users", json={"name": name, "password": "secret"}).json()
+    token = jwt.encode({"name": name, "password": "secret"}, SECRET_KEY, algorithm=ALGORITHM)
+    response = client.post(
+        POSTS,
+        json={"name": name, "content": "content", "user_id": int(user["id"])},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_get_sends_the_validators(client):
+    post = _create_post(client, "validated")
+
+    response = client.get(f"{POSTS}/{post['id']}")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "Last-Modified" in response.headers
+
+
+def test_matching_etag_is_not_modified(client):
+    post = _create_post(client, "unchanged")
+    etag = client.get(f"{POSTS}/{post['id']}").headers["ETag"]
+
+    response = client.get(f"{POSTS}/{post['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+
+def test_write_changes_the_etag(client):
+    post = _create_post(client, "before a write")
+    etag = client.get(f"{POSTS}/{post['id']}").headers["ETag"]
+    _create_post(client, "the write")
+
+    response = client.get(f"{POSTS}/{post['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_list_is_not_modified_until_a_write(client):
+    etag = client.get(POSTS).headers["ETag"]
+    assert client.get(POSTS, headers={"If-None-Match": etag}).status_code == 304
+
+    _create_post(client, "changes the list")
+
+    assert client.get(POSTS, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since(client):
+    post = _create_post(client, "dated")
+    last_modified = client.get(f"{POSTS}/{post['id']}").headers["Last-Modified"]
+
+    current = client.get(f"{POSTS}/{post['id']}", headers={"If-Modified-Since": last_modified})
+    earlier = client.get(
+        f"{POSTS}/{post['id']}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+
+    assert current.status_code == 304
+    assert earlier.status_code == 200
+
+
+def test_any_etag_matches_only_an_existing_post(client):
+    post = _create_post(client, "exists")
+
+    existing = client.get(f"{POSTS}/{post['id']}", headers={"If-None-Match": "*"})
+    missing = client.get(f"{POSTS}/999999", headers={"If-None-Match": "*"})
+
+    assert existing.status_code == 304
+    assert missing.status_code == 404
+
+
+def test_any_etag_on_an_unknown_user(client):
+    response = client.get("/api/v1/users/999999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
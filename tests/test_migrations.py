@@ -0,0 +1,93 @@
+"""Tests of the versioned schema migrations."""
+
+import asyncio
+import logging
+import sqlite3
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.migrations import LATEST_VERSION, migrate
+
+
+def _indexes(path) -> set[str]:
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        return {name for (name,) in rows if not name.startswith("sqlite_")}
+
+
+def _user_version(path) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _migrate(path, workers: int = 1) -> list[int]:
+    """Migrates a database from several engines at once, as workers starting together."""
+
+    async def scenario():
+        engines = [create_async_engine(f"sqlite+aiosqlite:///{path}") for _ in range(workers)]
+        try:
+            return await asyncio.gather(*(migrate(engine) for engine in engines))
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_new_database_is_migrated_to_the_latest_version(tmp_path):
+    path = tmp_path / "new.db"
+
+    assert _migrate(path) == [LATEST_VERSION]
+
+    assert _user_version(path) == LATEST_VERSION
+    assert _indexes(path) == {"ix_users_name", "ix_posts_name", "ix_posts_user_id"}
+    # Migrating a current database changes nothing.
+    assert _migrate(path) == [LATEST_VERSION]
+
+
+def test_database_created_before_versioning_is_adopted(tmp_path):
+    path = tmp_path / "baseline.db"
+    with sqlite3.connect(path) as connection:
+        # The schema create_all used to create, without indexes or a version.
+        connection.executescript(
+            """
+            CREATE TABLE users (
+                id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id)
+            );
+            CREATE TABLE posts (
+                id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                content VARCHAR NOT NULL,
+                user_id INTEGER,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(user_id) REFERENCES users (id)
+            );
+            INSERT INTO users VALUES (1, 'user', 'password', '2024-01-01 00:00:00');
+            INSERT INTO posts VALUES (1, 'post', 'content', 1, '2024-01-01 00:00:00');
+            """
+        )
+
+    assert _migrate(path) == [LATEST_VERSION]
+
+    assert _user_version(path) == LATEST_VERSION
+    assert "ix_users_name" in _indexes(path)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT name FROM posts").fetchall() == [("post",)]
+
+
+def test_concurrent_migrations_apply_once(tmp_path, caplog):
+    path = tmp_path / "concurrent.db"
+
+    with caplog.at_level(logging.INFO):
+        assert _migrate(path, workers=4) == [LATEST_VERSION] * 4
+
+    applied = [record for record in caplog.records if "Applying migration 1" in record.message]
+    assert len(applied) == 1
+
+    assert _user_version(path) == LATEST_VERSION
+    assert _indexes(path) == {"ix_users_name", "ix_posts_name", "ix_posts_user_id"}
@@ -0,0 +1,82 @@
+"""Tests of the cursor pagination of the list endpoints."""
+
+import pytest
+from jose import jwt
+
+from src.core.auth import ALGORITHM, SECRET_KEY
+from src.core.responses import NEXT_CURSOR_HEADER
+
+
+@pytest.mark.parametrize("path", ["/api/v1/posts", "/api/v1/users"])
+def test_cursor_without_limit_is_rejected(client, path):
+    response = client.get(path, params={"after": 1})
+
+    assert response.status_code == 422
+
+
+def test_cursor_with_limit_returns_the_next_page(client):
+    for number in range(3):
+        client.post("/api/v1/users", json={"name": f"paged {number}", "password": "secret"})
+
+    first = client.get("/api/v1/users", params={"limit": 2})
+    second = client.get(
+        "/api/v1/users", params={"limit": 2, "after": first.headers[NEXT_CURSOR_HEADER]}
+    )
+
+    assert first.status_code == second.status_code == 200
+    first_ids = [int(user["id"]) for user in first.json()]
+    second_ids = [int(user["id"]) for user in second.json()]
+    assert second_ids and min(second_ids) > max(first_ids)
+
+
+def _user_with_posts(client, name: str, count: int) -> tuple[int, list[dict]]:
+    """Creates a user with posts and returns its id and the posts."""
+    response = client.post("/api/v1/users", json={"name": name, "password": "secret"})
+    user_id = int(response.json()["id"])
+    token = jwt.encode({"name": name, "password": "secret"}, SECRET_KEY, algorithm=ALGORITHM)
+    posts = [
+        {"name": f"{name} {number}", "content": "content", "user_id": user_id}
+        for number in range(count)
+    ]
+    response = client.post(
+        "/api/v1/posts/bulk", json=posts, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 201
+    return user_id, response.json()
+
+
+def test_posts_of_a_user_are_paged(client):
+    user_id, posts = _user_with_posts(client, "paged author", 3)
+    _user_with_posts(client, "other author", 1)
+
+    first = client.get(f"/api/v1/users/{user_id}/posts", params={"limit": 2})
+    second = client.get(
+        f"/api/v1/users/{user_id}/posts",
+        params={"limit": 2, "after": first.headers[NEXT_CURSOR_HEADER]},
+    )
+
+    assert first.status_code == second.status_code == 200
+    assert [post["id"] for post in first.json() + second.json()] == [
+        post["id"] for post in posts
+    ]
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+
+def test_posts_of_a_user_since_a_time(client):
+    user_id, posts = _user_with_posts(client, "polled author", 2)
+    path = f"/api/v1/users/{user_id}/posts"
+
+    since_created = client.get(path, params={"since": posts[0]["created_at"]})
+    since_past = client.get(path, params={"since": "2001-01-01T00:00:00+00:00"})
+    since_future = client.get(path, params={"since": "2999-01-01T00:00:00"})
+
+    assert len(since_created.json()) == 2
+    assert len(since_past.json()) == 2
+    assert since_future.status_code == 200
+    assert since_future.json() == []
+
+
+def test_posts_of_an_unknown_user(client):
+    response = client.get("/api/v1/users/999999/posts")
+
+    assert response.status_code == 404
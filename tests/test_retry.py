@@ -0,0 +1,153 @@
+"""Tests of the retry policy and circuit breaker of database operations."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.database import retry
+from src.database.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FakeOperation:
+    """An operation that fails with the given errors before it succeeds."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.attempts = 0
+        self.rollbacks = 0
+
+    async def __call__(self) -> str:
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+def _locked() -> OperationalError:
+    return OperationalError("INSERT", {}, Exception("database is locked"))
+
+
+def _duplicate() -> IntegrityError:
+    return IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed: posts.name"))
+
+
+def _policy(max_attempts: int = 5, deadline: float = 10.0, threshold: int = 3) -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=max_attempts,
+        base_delay=0.001,
+        max_delay=0.001,
+        deadline=deadline,
+        breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=10.0),
+    )
+
+
+def test_transient_error_is_retried_after_a_rollback():
+    operation = FakeOperation(_locked(), _locked())
+
+    result = asyncio.run(_policy().call(operation, operation.rollback))
+
+    assert result == "done"
+    assert operation.attempts == 3
+    assert operation.rollbacks == 2
+
+
+def test_integrity_error_is_never_retried():
+    policy = _policy()
+    operation = FakeOperation(_duplicate())
+
+    with pytest.raises(IntegrityError):
+        asyncio.run(policy.call(operation, operation.rollback))
+
+    assert operation.attempts == 1
+    assert operation.rollbacks == 0
+    assert policy.breaker.failures == 0
+
+
+def test_operation_without_rollback_is_not_retried():
+    operation = FakeOperation(_locked())
+
+    with pytest.raises(OperationalError):
+        asyncio.run(_policy().call(operation))
+
+    assert operation.attempts == 1
+
+
+def test_retries_stop_after_the_last_attempt():
+    operation = FakeOperation(*(_locked() for _ in range(10)))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(_policy(max_attempts=4).call(operation, operation.rollback))
+
+    assert operation.attempts == 4
+    assert operation.rollbacks == 3
+
+
+def test_retries_stop_at_the_deadline():
+    operation = FakeOperation(*(_locked() for _ in range(10)))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(_policy(deadline=0).call(operation, operation.rollback))
+
+    assert operation.attempts == 1
+
+
+def test_circuit_opens_half_opens_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    policy = _policy(max_attempts=1, threshold=2)
+
+    async def scenario():
+        for _ in range(2):
+            operation = FakeOperation(_locked())
+            with pytest.raises(OperationalError):
+                await policy.call(operation, operation.rollback)
+        assert policy.breaker.is_open
+        assert policy.breaker.trips == 1
+
+        # Open: the operation is not even attempted.
+        operation = FakeOperation()
+        with pytest.raises(CircuitOpenError) as error:
+            await policy.call(operation, operation.rollback)
+        assert error.value.retry_after == pytest.approx(10.0)
+        assert operation.attempts == 0
+
+        # Half open: a single trial call is let through, the others are rejected.
+        now[0] += 10.0
+        assert policy.breaker.allow()
+        assert not policy.breaker.allow()
+
+        # The successful trial closes the circuit.
+        now[0] += 10.0
+        operation = FakeOperation()
+        assert await policy.call(operation, operation.rollback) == "done"
+        assert not policy.breaker.is_open
+        assert policy.breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_keeps_the_circuit_open(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    policy = _policy(max_attempts=1, threshold=1)
+
+    async def scenario():
+        operation = FakeOperation(_locked())
+        with pytest.raises(OperationalError):
+            await policy.call(operation, operation.rollback)
+
+        now[0] += 10.0
+        operation = FakeOperation(_locked())
+        with pytest.raises(OperationalError):
+            await policy.call(operation, operation.rollback)
+
+        assert policy.breaker.is_open
+        assert policy.breaker.retry_after() == pytest.approx(10.0)
+        assert policy.breaker.trips == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,173 @@
+"""Tests of the commands websocket clients can send."""
+
+import pytest
+from jose import jwt
+
+from src.core.auth import ALGORITHM, SECRET_KEY
+from src.core.config import get_settings
+
+
+def _delta(client, query: str = ""):
+    """Connects a delta client; the first frame it receives is a snapshot."""
+    return client.websocket_connect(f"/ws?mode=delta{query}")
+
+
+def test_delta_client_receives_a_snapshot_on_connect(client):
+    with _delta(client) as websocket:
+        snapshot = websocket.receive_json()
+
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["topics"] == ["posts"]
+    assert isinstance(snapshot["posts"], list)
+
+
+def test_ping_is_answered_with_pong(client):
+    with _delta(client) as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "ping"})
+
+        assert websocket.receive_json() == {"type": "pong"}
+
+
+@pytest.mark.parametrize("command", ["get_snapshot", "resync"])
+def test_snapshot_commands_send_a_new_snapshot(client, command):
+    with _delta(client) as websocket:
+        first = websocket.receive_json()
+        websocket.send_json({"type": command})
+
+        second = websocket.receive_json()
+
+    assert second["type"] == "snapshot"
+    assert (second["epoch"], second["seq"]) == (first["epoch"], first["seq"])
+
+
+def test_subscribe_and_unsubscribe_change_the_topics(client):
+    with _delta(client) as websocket:
+        websocket.receive_json()
+
+        websocket.send_json({"type": "subscribe", "topic": "users"})
+        subscribed = websocket.receive_json()
+        websocket.send_json({"type": "unsubscribe", "topic": "users"})
+        unsubscribed = websocket.receive_json()
+
+    assert subscribed["topics"] == ["posts", "users"]
+    assert isinstance(subscribed["users"], list)
+    assert unsubscribed["topics"] == ["posts"]
+    assert "users" not in unsubscribed
+
+
+def test_subscribe_to_the_posts_of_a_user(client):
+    with _delta(client, "&topic=users") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "subscribe", "topic": "posts:user:1"})
+
+        assert websocket.receive_json()["topics"] == ["posts:user:1", "users"]
+
+
+def test_subscribe_to_an_unknown_topic_is_rejected(client):
+    with _delta(client) as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "subscribe", "topic": "comments"})
+
+        assert websocket.receive_json() == {
+            "type": "error",
+            "detail": "Unknown topic: comments.",
+        }
+
+
+def test_resume_with_the_current_sequence_number(client):
+    with _delta(client) as websocket:
+        snapshot = websocket.receive_json()
+        websocket.send_json(
+            {"type": "resume", "epoch": snapshot["epoch"], "last_seq": snapshot["seq"]}
+        )
+
+        assert websocket.receive_json() == {
+            "type": "resumed",
+            "epoch": snapshot["epoch"],
+            "seq": snapshot["seq"],
+        }
+
+
+def test_resume_from_another_epoch_sends_a_snapshot(client):
+    with _delta(client) as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "resume", "epoch": "unknown", "last_seq": 0})
+
+        assert websocket.receive_json()["type"] == "snapshot"
+
+
+@pytest.mark.parametrize(
+    "message, detail",
+    [
+        ('{"type": "shout"}', "Unknown command: shout."),
+        ("not json", "Messages must be JSON objects with a type."),
+    ],
+)
+def test_invalid_messages_are_rejected(client, message, detail):
+    with _delta(client) as websocket:
+        websocket.receive_json()
+        websocket.send_text(message)
+
+        assert websocket.receive_json() == {"type": "error", "detail": detail}
+
+
+def test_list_client_receives_the_list_for_any_message(client):
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("anything")
+
+        assert isinstance(websocket.receive_json(), list)
+
+
+def test_messages_beyond_the_rate_limit_are_rejected(client):
+    burst = get_settings().WEBSOCKET_RATE_BURST
+    with _delta(client) as websocket:
+        websocket.receive_json()
+        for _ in range(burst + 5):
+            websocket.send_json({"type": "ping"})
+
+        frames = [websocket.receive_json() for _ in range(burst + 5)]
+
+    assert frames[:burst] == [{"type": "pong"}] * burst
+    assert {"type": "error", "detail": "Rate limit exceeded."} in frames[burst:]
+
+
+def test_delta_client_receives_created_posts(client):
+    response = client.post("/api/v1/users", json={"name": "websocket", "password": "secret"})
+    user_id = int(response.json()["id"])
+    token = jwt.encode({"name": "websocket", "password": "secret"}, SECRET_KEY, ALGORITHM)
+
+    with _delta(client, f"&topic=posts:user:{user_id}") as websocket:
+        snapshot = websocket.receive_json()
+        response = client.post(
+            "/api/v1/posts",
+            json={"name": "websocket post", "content": "content", "user_id": user_id},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 201
+
+        event = websocket.receive_json()
+
+    assert event["type"] == "post_created"
+    assert event["seq"] > snapshot["seq"]
+    assert event["post"]["name"] == "websocket post"
+
+
+def test_resync_skips_closed_connections(client, monkeypatch):
+    # pylint: disable=import-outside-toplevel
+    from src.routers.posts import websockets
+    from src.routers.posts.connections import Connection
+
+    triggers = []
+    monkeypatch.setattr(websockets.list_refresher, "trigger", lambda: triggers.append(True))
+    monkeypatch.setattr(websockets, "_changed_all", False)
+    # Closed by a send timeout or the disconnect policy, but not unregistered yet.
+    closed = Connection(None, max_size=1, policy="disconnect", send_timeout=1.0, mode="delta")
+    closed.closed = True
+    websockets.websocket_connections.add(closed)
+
+    client.portal.call(websockets._deliver, {"event": "resync", "items": []})
+
+    assert closed not in websockets.websocket_connections
+    assert websockets._changed_all
+    assert triggers